@@ -0,0 +1,55 @@
+import os
+
+import pytest
+import yaml
+
+import wafer.mongo_db_operations.mongo_operations as mongo_operations
+from wafer.s3_bucket_operations.s3_operations import shared
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """
+    Runs the test in a temporary directory with a copy of params.yaml, which stores the
+    buckets in a local directory and turns the local cache off, so no test needs network
+    access
+    """
+    with open(os.path.join(ROOT_DIR, "params.yaml")) as f:
+        config = yaml.safe_load(f)
+
+    config["storage"] = {
+        "backend": "local",
+        "local_root_dir": str(tmp_path / "storage"),
+    }
+
+    config["s3_cache"]["enabled"] = False
+
+    with open(tmp_path / "params.yaml", "w") as f:
+        yaml.safe_dump(config, f)
+
+    (tmp_path / "logs").mkdir()
+
+    monkeypatch.chdir(tmp_path)
+
+    monkeypatch.setitem(shared, "pid", None)
+
+    return config
+
+
+@pytest.fixture
+def mongo_client(config, monkeypatch):
+    """
+    Replaces the MongoDB client with one in memory mongomock client, shared by every
+    MongoDB operation of the test
+    """
+    mongomock = pytest.importorskip("mongomock")
+
+    client = mongomock.MongoClient()
+
+    monkeypatch.setenv("MONGODB_URL", "mongodb://localhost")
+
+    monkeypatch.setattr(mongo_operations, "MongoClient", lambda *args: client)
+
+    return client
@@ -0,0 +1,28 @@
+from wafer.raw_data_validation.file_name_classifier import classify_file_names
+
+REGEX = "['wafer']+['\\_'']+[\\d_]+[\\d]+\\.csv"
+
+
+def test_classify_file_names():
+    fnames = [
+        "wafer_08012020_120000.csv",
+        "wafer_0801202_120000.csv",
+        "wafer_08012020_12000.csv",
+        "sensor_08012020_120000.csv",
+        "wafer_08012020_120000.txt",
+    ]
+
+    good_fnames, bad_fnames = classify_file_names(fnames, REGEX, 8, 6)
+
+    assert good_fnames == ["wafer_08012020_120000.csv"]
+
+    assert bad_fnames == [
+        ("wafer_0801202_120000.csv", "invalid length of date stamp"),
+        ("wafer_08012020_12000.csv", "invalid length of time stamp"),
+        ("sensor_08012020_120000.csv", "invalid file name"),
+        ("wafer_08012020_120000.txt", "invalid file name"),
+    ]
+
+
+def test_classify_no_file_names():
+    assert classify_file_names([], REGEX, 8, 6) == ([], [])
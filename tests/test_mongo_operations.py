@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wafer.data_type_valid.data_type_valid_train import DB_Operation_Train
+from wafer.mongo_db_operations.mongo_operations import MongoDB_Operation
+
+DB_NAME = "wafer-data"
+
+COLLECTION_NAME = "wafer-train-data"
+
+LOG_FILE = "test_log.txt"
+
+
+def get_wafer_frame(rows=5):
+    return pd.DataFrame(
+        {
+            "Wafer": np.arange(1, rows + 1),
+            "Sensor-1": np.where(np.arange(rows) % 2 == 0, np.nan, 0.25),
+            "Sensor-2": np.linspace(-1, 1, rows, dtype="float32"),
+            "Output": np.where(np.arange(rows) % 2 == 0, 1, -1),
+        }
+    )
+
+
+def test_get_records_from_dataframe(mongo_client):
+    mongo = MongoDB_Operation()
+
+    df = get_wafer_frame(2)
+
+    df["Name"] = ["a", None]
+
+    records = mongo.get_records_from_dataframe(df, LOG_FILE)
+
+    assert records == [
+        {"Wafer": 1, "Sensor-1": None, "Sensor-2": -1.0, "Output": 1, "Name": "a"},
+        {"Wafer": 2, "Sensor-1": 0.25, "Sensor-2": 1.0, "Output": -1, "Name": None},
+    ]
+
+    assert all(type(record["Wafer"]) is int for record in records)
+
+
+def test_packed_layout_round_trip(mongo_client):
+    mongo = MongoDB_Operation()
+
+    mongo.layout = "packed"
+
+    df = get_wafer_frame()
+
+    mongo.insert_dataframe_as_record(df, DB_NAME, COLLECTION_NAME, LOG_FILE)
+
+    doc = mongo_client[DB_NAME][COLLECTION_NAME].find_one()
+
+    assert sorted(doc) == ["Output", "Wafer", "_id", "sensors"]
+
+    assert len(doc["sensors"]) == 2 * 4
+
+    layout = mongo.get_layout(DB_NAME, COLLECTION_NAME, LOG_FILE)
+
+    assert layout["packed_columns"] == ["Sensor-1", "Sensor-2"]
+
+    back = mongo.get_collection_as_dataframe(
+        DB_NAME, COLLECTION_NAME, LOG_FILE, exclude_fields=["_id"]
+    )
+
+    assert back.columns.tolist() == df.columns.tolist()
+
+    assert back["Wafer"].tolist() == df["Wafer"].tolist()
+
+    assert back["Output"].tolist() == df["Output"].tolist()
+
+    np.testing.assert_array_equal(
+        back[["Sensor-1", "Sensor-2"]].to_numpy(),
+        df[["Sensor-1", "Sensor-2"]].to_numpy(dtype="float32"),
+    )
+
+
+def test_skip_ingest_inserts_failed_source_again(mongo_client, monkeypatch):
+    db_operation = DB_Operation_Train()
+
+    db_operation.mongo.ingest_mode = "skip"
+
+    db_operation.mongo.insert_batch_size = 2
+
+    source = {"source_file": "wafer_1", "source_etag": '"1"'}
+
+    monkeypatch.setattr(db_operation, "get_source", lambda file, manifest: source)
+
+    lst = [(get_wafer_frame(), "good/train/wafer_1.csv", "wafer_1.csv")]
+
+    collection = mongo_client[DB_NAME][COLLECTION_NAME]
+
+    insert_records_in_batches = db_operation.mongo.insert_records_in_batches
+
+    def failing_insert(collection, records, log_file):
+        collection.insert_many(records[:2])
+
+        raise ValueError("failed batch")
+
+    monkeypatch.setattr(
+        db_operation.mongo, "insert_records_in_batches", failing_insert
+    )
+
+    with pytest.raises(Exception, match="failed batch"):
+        db_operation.insert_good_data_as_record(DB_NAME, COLLECTION_NAME, lst=lst)
+
+    assert collection.count_documents({}) == 2
+
+    assert not db_operation.mongo.has_source(
+        DB_NAME, COLLECTION_NAME, source, LOG_FILE
+    )
+
+    monkeypatch.setattr(
+        db_operation.mongo, "insert_records_in_batches", insert_records_in_batches
+    )
+
+    for _ in range(2):
+        inserted_files = db_operation.insert_good_data_as_record(
+            DB_NAME, COLLECTION_NAME, lst=lst
+        )
+
+        assert inserted_files == ["good/train/wafer_1.csv"]
+
+        assert collection.count_documents(source) == 5
+
+    assert db_operation.mongo.has_source(DB_NAME, COLLECTION_NAME, source, LOG_FILE)
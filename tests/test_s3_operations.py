@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from wafer.s3_bucket_operations.s3_operations import S3_Operation
+
+BUCKET = "wafer-train-data"
+
+LOG_FILE = "test_log.txt"
+
+
+def get_frames(chunks, rows):
+    for idx in range(chunks):
+        yield pd.DataFrame(
+            {
+                "Wafer": np.arange(idx * rows, (idx + 1) * rows),
+                "Sensor-1": np.where(np.arange(rows) % 3 == 0, np.nan, 0.5),
+                "Output": np.ones(rows, dtype="int32" if idx else "int64"),
+            }
+        )
+
+
+def get_keys(config, folder):
+    folder_dir = os.path.join(config["storage"]["local_root_dir"], BUCKET, folder)
+
+    return sorted(os.listdir(folder_dir)) if os.path.isdir(folder_dir) else []
+
+
+@pytest.mark.parametrize("intermediate_format", ["parquet", "csv"])
+def test_upload_frames_as_stream(config, intermediate_format):
+    s3 = S3_Operation()
+
+    s3.intermediate_format = intermediate_format
+
+    s3.part_size = 5 * 1024 ** 2
+
+    frame_file = s3.upload_frames_as_stream(
+        get_frames(4, 50000), "good/wafer.csv", BUCKET, LOG_FILE
+    )
+
+    assert frame_file == "good/wafer." + intermediate_format
+
+    df = s3.read_frame(frame_file, BUCKET, LOG_FILE)
+
+    expected = pd.concat(list(get_frames(4, 50000)), ignore_index=True)
+
+    assert df.shape == expected.shape
+
+    assert df["Wafer"].tolist() == expected["Wafer"].tolist()
+
+    assert df["Sensor-1"].isna().sum() == expected["Sensor-1"].isna().sum()
+
+    assert get_keys(config, "good") == ["wafer." + intermediate_format]
+
+
+def test_upload_frames_as_stream_writes_csv_header_once(config):
+    s3 = S3_Operation()
+
+    s3.intermediate_format = "csv"
+
+    empty = next(get_frames(1, 0))
+
+    frame_file = s3.upload_frames_as_stream(
+        iter([empty] + list(get_frames(2, 2)) + [empty]),
+        "good/wafer.csv",
+        BUCKET,
+        LOG_FILE,
+    )
+
+    content = s3.read_text(frame_file, BUCKET, LOG_FILE)
+
+    assert content.count("Wafer") == 1
+
+    assert len(content.splitlines()) == 5
+
+
+def test_upload_frames_as_stream_not_committed(config):
+    s3 = S3_Operation()
+
+    frame_file = s3.upload_frames_as_stream(
+        get_frames(2, 10), "good/wafer.csv", BUCKET, LOG_FILE, commit=lambda: False
+    )
+
+    assert frame_file is None
+
+    assert get_keys(config, "good") == []
+
+
+def test_upload_frames_as_stream_aborted(config):
+    s3 = S3_Operation()
+
+    def failing_frames():
+        yield from get_frames(1, 10)
+
+        raise ValueError("failed chunk")
+
+    with pytest.raises(Exception, match="failed chunk"):
+        s3.upload_frames_as_stream(failing_frames(), "good/wafer.csv", BUCKET, LOG_FILE)
+
+    assert get_keys(config, "good") == []
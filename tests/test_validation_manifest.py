@@ -0,0 +1,149 @@
+import json
+from io import BytesIO
+
+from wafer.raw_data_validation.validation_manifest import Validation_Manifest
+
+LOG_FILE = "test_log.txt"
+
+
+def get_manifest():
+    manifest = Validation_Manifest("train_manifest.json", "train_quality_report.json")
+
+    manifest.load_manifest(LOG_FILE)
+
+    return manifest
+
+
+def read_manifest(manifest):
+    return manifest.s3.read_json(
+        manifest.manifest_file, manifest.input_files_bucket, LOG_FILE
+    )
+
+
+def test_save_manifest(config):
+    manifest = get_manifest()
+
+    manifest.record("training_data/wafer_1.csv", '"1"', "validated")
+
+    manifest.record("training_data/wafer_2.csv", '"2"', "bad", "invalid file name")
+
+    manifest.record_inserted(["good/train/wafer_1.csv"])
+
+    manifest.save_manifest(LOG_FILE)
+
+    saved = get_manifest()
+
+    assert read_manifest(saved) == {
+        "training_data/wafer_1.csv": {"etag": '"1"', "status": "good", "reason": None},
+        "training_data/wafer_2.csv": {
+            "etag": '"2"',
+            "status": "bad",
+            "reason": "invalid file name",
+        },
+    }
+
+    assert saved.is_processed("training_data/wafer_1.csv", '"1"')
+
+    assert not saved.is_processed("training_data/wafer_1.csv", '"3"')
+
+
+def test_record_inserted_marks_files_not_inserted_as_error(config):
+    manifest = get_manifest()
+
+    manifest.record("training_data/wafer_1.csv", '"1"', "validated")
+
+    manifest.record_inserted([])
+
+    assert manifest.manifest["training_data/wafer_1.csv"]["status"] == "error"
+
+    assert not manifest.is_processed("training_data/wafer_1.csv", '"1"')
+
+
+def test_save_manifest_merges_overlapping_runs(config):
+    first_run, second_run = get_manifest(), get_manifest()
+
+    first_run.record("training_data/wafer_1.csv", '"1"', "bad", "empty file")
+
+    second_run.record("training_data/wafer_2.csv", '"2"', "bad", "empty file")
+
+    first_run.save_manifest(LOG_FILE)
+
+    second_run.save_manifest(LOG_FILE)
+
+    assert sorted(read_manifest(get_manifest())) == [
+        "training_data/wafer_1.csv",
+        "training_data/wafer_2.csv",
+    ]
+
+    third_run = get_manifest()
+
+    third_run.record("training_data/wafer_3.csv", '"3"', "bad", "empty file")
+
+    first_run.record("training_data/wafer_4.csv", '"4"', "bad", "empty file")
+
+    third_run.save_manifest(LOG_FILE)
+
+    first_run.save_manifest(LOG_FILE)
+
+    assert sorted(read_manifest(get_manifest())) == [
+        "training_data/wafer_1.csv",
+        "training_data/wafer_2.csv",
+        "training_data/wafer_3.csv",
+        "training_data/wafer_4.csv",
+    ]
+
+
+def test_load_manifest_changed_while_loading(config, monkeypatch):
+    manifest = Validation_Manifest("train_manifest.json", "train_quality_report.json")
+
+    bucket = manifest.input_files_bucket
+
+    def upload_manifest(dic):
+        manifest.s3.upload_buffer(
+            BytesIO(json.dumps(dic).encode()), manifest.manifest_file, bucket, LOG_FILE
+        )
+
+    old_entry = {"etag": '"1"', "status": "bad", "reason": "empty file"}
+
+    upload_manifest({"training_data/wafer_1.csv": old_entry})
+
+    load_object = manifest.s3.load_object
+
+    def load_object_of_changed_manifest(fname, bucket, log_file):
+        response = load_object(fname, bucket, log_file)
+
+        if fname == manifest.manifest_file:
+            monkeypatch.setattr(manifest.s3, "load_object", load_object)
+
+            upload_manifest(
+                {
+                    "training_data/wafer_1.csv": old_entry,
+                    "training_data/wafer_2.csv": old_entry,
+                }
+            )
+
+        return response
+
+    monkeypatch.setattr(manifest.s3, "load_object", load_object_of_changed_manifest)
+
+    manifest.load_manifest(LOG_FILE)
+
+    assert sorted(manifest.manifest) == [
+        "training_data/wafer_1.csv",
+        "training_data/wafer_2.csv",
+    ]
+
+    assert (
+        manifest.etags[manifest.manifest_file]
+        == load_object(manifest.manifest_file, bucket, LOG_FILE)["ETag"]
+    )
+
+    manifest.record("training_data/wafer_3.csv", '"3"', "bad", "empty file")
+
+    manifest.save_manifest(LOG_FILE)
+
+    assert sorted(read_manifest(manifest)) == [
+        "training_data/wafer_1.csv",
+        "training_data/wafer_2.csv",
+        "training_data/wafer_3.csv",
+    ]
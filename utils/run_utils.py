@@ -0,0 +1,79 @@
+import uuid
+from datetime import datetime
+
+run_time_format = "%Y%m%d_%H%M%S"
+
+
+def get_run_id():
+    """
+    Method Name :   get_run_id
+    Description :   This method creates a new run id, starting with the time of the run so run ids sort by time
+
+    Output      :   A run id is returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_run_id.__name__
+
+    try:
+        run_id = datetime.now().strftime(run_time_format) + "_" + uuid.uuid4().hex[:8]
+
+        return run_id
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
+
+
+def get_run_time(run_id):
+    """
+    Method Name :   get_run_time
+    Description :   This method gets the time of the run from the run id
+
+    Output      :   The time of the run is returned, or None if it is not a run id
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_run_time.__name__
+
+    try:
+        try:
+            return datetime.strptime(run_id[:15], run_time_format)
+
+        except ValueError:
+            return None
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
+
+
+def get_run_dir(folder_name, run_id):
+    """
+    Method Name :   get_run_dir
+    Description :   This method gets the folder of the run inside the folder, when a run id is given
+
+    Output      :   The folder of the run is returned, or the folder itself if there is no run id
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_run_dir.__name__
+
+    try:
+        if run_id is None:
+            return folder_name
+
+        return folder_name + "/" + run_id
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
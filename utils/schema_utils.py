@@ -0,0 +1,142 @@
+import json
+import re
+import threading
+
+from utils.logger import App_Logger
+from utils.read_params import read_params
+from wafer.s3_bucket_operations.s3_operations import S3_Operation
+
+
+def get_schema_dtypes(column_names):
+    """
+    Method Name :   get_schema_dtypes
+    Description :   This method gets the pandas dtypes of the columns in the ColName map of the schema file,
+                    using the dtype of every schema type in the schema_dtypes section of params.yaml. The
+                    varchar wafer ids are parsed as strings, and made integers in transform_frame
+
+    Output      :   A dict of column name to pandas dtype is returned, or None when typed parsing is disabled
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_schema_dtypes.__name__
+
+    try:
+        config = read_params()
+
+        schema_dtypes = config["schema_dtypes"]
+
+        if schema_dtypes["enabled"] is not True or column_names is None:
+            return None
+
+        dtypes = {
+            col: schema_dtypes[col_type]
+            for col, col_type in column_names.items()
+            if col_type in schema_dtypes
+        }
+
+        return dtypes
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
+
+
+class Schema_Cache:
+    """
+    Description :   This class is used for loading the schema and regex files from the input files bucket once
+                    per process. Every later load only checks the etag of the file, and parses it again when
+                    the file has changed
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    lock = threading.Lock()
+
+    cache = {}
+
+    def __init__(self):
+        self.config = read_params()
+
+        self.input_files_bucket = self.config["s3_bucket"]["input_files"]
+
+        self.s3 = S3_Operation()
+
+        self.log_writer = App_Logger()
+
+        self.class_name = self.__class__.__name__
+
+    def get_object(self, fname, log_file, parse):
+        """
+        Method Name :   get_object
+        Description :   This method gets the parsed content of a file of the input files bucket from the
+                        cache, when the etag of the file is the same as the etag of the cached content
+
+        Output      :   The parsed content of the file is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_object.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            etag = self.s3.load_object(fname, self.input_files_bucket, log_file)["ETag"]
+
+            cache_key = self.input_files_bucket + "/" + fname
+
+            with self.lock:
+                entry = self.cache.get(cache_key)
+
+            if entry is not None and entry["etag"] == etag:
+                self.log_writer.log(log_file, f"Got {fname} from schema cache")
+
+            else:
+                content = self.s3.read_text(
+                    fname, self.input_files_bucket, log_file, etag=etag
+                )
+
+                entry = {"etag": etag, "value": parse(content)}
+
+                with self.lock:
+                    self.cache[cache_key] = entry
+
+                self.log_writer.log(log_file, f"Loaded {fname} in schema cache")
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return entry["value"]
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_schema(self, schema_file, log_file):
+        """
+        Method Name :   get_schema
+        Description :   This method gets the schema values of the schema file
+
+        Output      :   The schema values are returned as dict
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        return self.get_object(schema_file, log_file, json.loads)
+
+    def get_regex(self, regex_file, log_file):
+        """
+        Method Name :   get_regex
+        Description :   This method gets the compiled regex pattern of the regex file
+
+        Output      :   The compiled regex pattern is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        return self.get_object(regex_file, log_file, re.compile)
@@ -16,7 +16,7 @@ class Data_Getter_Train:
 
         self.log_file = log_file
 
-        self.train_csv_file = self.config["export_csv_file"]["train"]
+        self.train_export_file = self.config["export_file"]["train"]
 
         self.input_files_bucket = self.config["s3_bucket"]["input_files"]
 
@@ -42,8 +42,10 @@ class Data_Getter_Train:
         self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
         try:
-            df = self.s3.read_csv(
-                self.train_csv_file, self.input_files_bucket, self.log_file
+            df = self.s3.read_frame(
+                self.s3.get_frame_fname(self.train_export_file),
+                self.input_files_bucket,
+                self.log_file,
             )
 
             self.log_writer.start_log(
@@ -1,5 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
 from utils.logger import App_Logger
 from utils.read_params import read_params
+from utils.run_utils import get_run_dir
 from wafer.s3_bucket_operations.s3_operations import S3_Operation
 
 
@@ -12,7 +16,7 @@ class Data_Transform_Pred:
     Revisions   :   Moved to setup to cloud 
     """
 
-    def __init__(self):
+    def __init__(self, run_id=None):
         self.config = read_params()
 
         self.pred_data_bucket = self.config["s3_bucket"]["wafer_pred_data"]
@@ -23,7 +27,9 @@ class Data_Transform_Pred:
 
         self.log_writer = App_Logger()
 
-        self.good_pred_data_dir = self.config["data"]["pred"]["good"]
+        self.good_pred_data_dir = get_run_dir(
+            self.config["data"]["pred"]["good"], run_id
+        )
 
         self.pred_data_transform_log = self.config["pred_db_log"]["data_transform"]
 
@@ -50,19 +56,10 @@ class Data_Transform_Pred:
                 self.pred_data_transform_log,
             )
 
-            for idx, f in enumerate(lst):
-                df = f[idx][0]
-
-                file = f[idx][1]
-
-                abs_f = f[idx][2]
-
+            for df, file, abs_f in lst:
                 if file.endswith(".csv"):
-                    df.rename(columns={"Good/Bad": "Output"}, inplace=True)
-
-                    self.log_writer.log(
-                        self.pred_data_transform_log,
-                        f"Renamed the output columns for the file {file}",
+                    self.rename_target_column_in_frame(
+                        df, file, self.pred_data_transform_log
                     )
 
                     self.s3.upload_df_as_csv(
@@ -107,21 +104,10 @@ class Data_Transform_Pred:
                 self.pred_data_transform_log,
             )
 
-            for idx, f in enumerate(lst):
-                df = f[idx][0]
-
-                file = f[idx][1]
-
-                abs_f = f[idx][2]
-
+            for df, file, abs_f in lst:
                 if file.endswith(".csv"):
-                    df.fillna("NULL", inplace=True)
-
-                    df["Wafer"] = df["Wafer"].str[6:]
-
-                    self.log_writer.log(
-                        self.pred_data_transform_log,
-                        f"Replaced missing values with null for the file {file}",
+                    df = self.replace_missing_with_null_in_frame(
+                        df, file, self.pred_data_transform_log
                     )
 
                     self.s3.upload_df_as_csv(
@@ -143,3 +129,238 @@ class Data_Transform_Pred:
             self.log_writer.exception_log(
                 e, self.class_name, method_name, self.pred_data_transform_log,
             )
+
+    def rename_target_column_in_frame(self, df, file, log_file):
+        """
+        Method Name :   rename_target_column_in_frame
+        Description :   This method renames the target column from Good/Bad to Output, in a dataframe
+                        which is already in memory
+
+        Output      :   The target column of the dataframe is renamed in place
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.rename_target_column_in_frame.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            df.rename(columns={"Good/Bad": "Output"}, inplace=True)
+
+            self.log_writer.log(
+                log_file, f"Renamed the output columns for the file {file}",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def replace_missing_with_null_in_frame(self, df, file, log_file):
+        """
+        Method Name :   replace_missing_with_null_in_frame
+        Description :   This method replaces the missing values in columns with "NULL" and keeps only the
+                        "Integer" part of the first column, in a dataframe which is already in memory
+
+        Output      :   A new dataframe with missing values replaced with "NULL" is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.replace_missing_with_null_in_frame.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            df = df.fillna("NULL")
+
+            df["Wafer"] = df["Wafer"].str[6:]
+
+            self.log_writer.log(
+                log_file, f"Replaced missing values with null for the file {file}",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return df
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def transform_frame(self, df, file, log_file, downcast="integer"):
+        """
+        Method Name :   transform_frame
+        Description :   This method renames the target column from Good/Bad to Output and keeps only the
+                        "Integer" part of the first column as an integer column, in a dataframe which is
+                        already in memory. Missing values are kept as NaN, so the numeric columns keep their
+                        dtype. Chunks of a file pass downcast as None, so every chunk gets the same wafer dtype
+
+        Output      :   The transformed dataframe is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.transform_frame.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            df.rename(columns={"Good/Bad": "Output"}, inplace=True)
+
+            wafer = df["Wafer"].str[6:]
+
+            try:
+                df["Wafer"] = pd.to_numeric(wafer, downcast=downcast)
+
+            except ValueError:
+                df["Wafer"] = wafer
+
+            self.log_writer.log(log_file, f"Transformed the file {file}")
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return df
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def transform_file_in_chunks(self, file, log_file, chunks=None, commit=None):
+        """
+        Method Name :   transform_file_in_chunks
+        Description :   This method transforms a good data file chunk by chunk, every chunk is transformed and
+                        written to a multipart upload in the intermediate format as soon as it is read, so only
+                        one chunk is held in memory. The chunks of the file are read from the bucket unless
+                        they are passed, commit is passed on to the upload
+
+        Output      :   The file name the transformed file was uploaded as is returned, or None if it was not committed
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.transform_file_in_chunks.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            if chunks is None:
+                chunks = self.s3.iter_csv_chunks(file, self.pred_data_bucket, log_file)
+
+            frames = (
+                self.transform_frame(df, file, log_file, downcast=None) for df in chunks
+            )
+
+            frame_file = self.s3.upload_frames_as_stream(
+                frames,
+                file,
+                self.pred_data_bucket,
+                log_file,
+                commit=commit,
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return frame_file
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def transform_good_data(self, lst=None, log_file=None):
+        """
+        Method Name :   transform_good_data
+        Description :   This method transforms the good data files in a single pass, every file is read once,
+                        transformed in memory and written back once in the intermediate format of params.yaml.
+                        When the list of good dataframes is passed, the good data folder is not read again.
+                        Otherwise the large files of the folder are transformed in chunks, and are returned
+                        without a dataframe
+
+        Output      :   A list of tuple of transformed dataframes, along with absolute file name and file name is returned,
+                        the dataframe is None for the files transformed in chunks
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.transform_good_data.__name__
+
+        if log_file is None:
+            log_file = self.pred_data_transform_log
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            large_files = []
+
+            if lst is None:
+                lst = self.s3.read_csv_from_folder(
+                    self.good_pred_data_dir,
+                    self.pred_data_bucket,
+                    log_file,
+                    skip_large_files=True,
+                )
+
+                large_files = self.s3.get_large_files_from_folder(
+                    self.good_pred_data_dir, self.pred_data_bucket, log_file
+                )
+
+            good_lst = []
+
+            with ThreadPoolExecutor(max_workers=self.s3.copy_workers) as executor:
+                futures = []
+
+                for df, file, abs_f in lst:
+                    if file.endswith(".csv"):
+                        df = self.transform_frame(df, file, log_file)
+
+                        futures.append(
+                            executor.submit(
+                                self.s3.upload_frame,
+                                df,
+                                file,
+                                self.pred_data_bucket,
+                                log_file,
+                            )
+                        )
+
+                        good_lst.append((df, file, abs_f))
+
+                    else:
+                        pass
+
+                frame_files = [future.result() for future in futures]
+
+            for f in large_files:
+                if f["key"].endswith(".csv"):
+                    frame_file = self.transform_file_in_chunks(f["key"], log_file)
+
+                    good_lst.append((None, f["key"], f["key"].split("/")[-1]))
+
+                    frame_files.append(frame_file)
+
+            replaced_files = [
+                file
+                for (df, file, abs_f), frame_file in zip(good_lst, frame_files)
+                if frame_file != file
+            ]
+
+            self.s3.delete_files_bulk(replaced_files, self.pred_data_bucket, log_file)
+
+            good_lst = [
+                (df, frame_file, frame_file.split("/")[-1])
+                for (df, file, abs_f), frame_file in zip(good_lst, frame_files)
+            ]
+
+            self.log_writer.log(
+                log_file, f"Transformed {len(good_lst)} good files in a single pass"
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return good_lst
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
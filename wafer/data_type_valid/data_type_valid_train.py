@@ -1,5 +1,8 @@
+import os
+
 from utils.logger import App_Logger
 from utils.read_params import read_params
+from utils.run_utils import get_run_dir
 from wafer.mongo_db_operations.mongo_operations import MongoDB_Operation
 from wafer.s3_bucket_operations.s3_operations import S3_Operation
 
@@ -12,65 +15,207 @@ class DB_Operation_Train:
     Revisions   :   Moved to setup to cloud 
     """
 
-    def __init__(self):
+    def __init__(self, run_id=None):
         self.config = read_params()
 
         self.class_name = self.__class__.__name__
 
         self.train_data_bucket = self.config["s3_bucket"]["wafer_train_data"]
 
-        self.train_export_csv_file = self.config["export_csv_file"]["train"]
+        self.train_export_file = self.config["export_file"]["train"]
 
-        self.good_data_train_dir = self.config["data"]["train"]["good"]
+        self.good_data_train_dir = get_run_dir(
+            self.config["data"]["train"]["good"], run_id
+        )
 
         self.input_files_bucket = self.config["s3_bucket"]["input_files"]
 
         self.train_db_insert_log = self.config["train_db_log"]["db_insert"]
 
-        self.train_export_csv_log = self.config["train_db_log"]["export_csv"]
+        self.train_export_log = self.config["train_db_log"]["export"]
 
         self.s3 = S3_Operation()
 
         self.mongo = MongoDB_Operation()
 
+        self.stream_export = self.config["mongodb"]["stream_export"]
+
+        self.server_stats = (
+            self.config["mongodb"]["server_stats"] is True
+            and self.mongo.layout != "packed"
+        )
+
         self.log_writer = App_Logger()
 
-    def insert_good_data_as_record(self, good_data_db_name, good_data_collection_name):
+    def get_source(self, file, manifest=None):
         """
-        Method Name :   insert_good_data_as_record
-        Description :   This method inserts the good data in MongoDB as collection
+        Method Name :   get_source
+        Description :   This method gets the source of a good data file, its file name without folder and
+                        extension, and the etag of its raw file from the validation manifest. When the raw file
+                        is not in the manifest, the etag of the good data file is used
 
-        Output      :   A MongoDB collection is created with good data present in it
+        Output      :   A dict of source file and source etag is returned
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.insert_good_data_as_record.__name__
+        method_name = self.get_source.__name__
 
         self.log_writer.start_log(
             "start", self.class_name, method_name, self.train_db_insert_log,
         )
 
         try:
-            lst = self.s3.read_csv_from_folder(
-                self.good_data_train_dir,
-                self.train_data_bucket,
-                self.train_db_insert_log,
+            etag = None if manifest is None else manifest.get_source_etag(file)
+
+            if etag is None:
+                etag = self.s3.load_object(
+                    file, self.train_data_bucket, self.train_db_insert_log,
+                )["ETag"]
+
+            source = {
+                "source_file": os.path.splitext(file.split("/")[-1])[0],
+                "source_etag": etag,
+            }
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.train_db_insert_log,
             )
 
-            for idx, f in enumerate(lst):
-                df = f[idx][0]
+            return source
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.train_db_insert_log,
+            )
+
+    def insert_good_data_as_record(
+        self, good_data_db_name, good_data_collection_name, lst=None, manifest=None
+    ):
+        """
+        Method Name :   insert_good_data_as_record
+        Description :   This method inserts the good data in MongoDB as collection. When the list of good
+                        dataframes is passed, as returned by the fused stage, the good data folder is not read again.
+                        Files without a dataframe are inserted chunk by chunk. Every record is tagged with its
+                        source file and etag. With ingest_mode as skip, sources with a completion marker are
+                        skipped, and the records left by a failed insert of a source are deleted before it is
+                        inserted again. With upsert the records are upserted by source file and upsert key. With
+                        both the records of earlier versions of a source are deleted afterwards, and the source
+                        is marked as inserted once all of its records are in the collection
+
+        Output      :   A MongoDB collection is created with good data present in it, and the list of files
+                        whose records are in the collection is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.insert_good_data_as_record.__name__
 
-                file = f[idx][1]
+        self.log_writer.start_log(
+            "start", self.class_name, method_name, self.train_db_insert_log,
+        )
 
-                if file.endswith(".csv"):
-                    self.mongo.insert_dataframe_as_record(
-                        df,
-                        db_name=good_data_db_name,
-                        collection_name=good_data_collection_name,
-                        log_file=self.train_db_insert_log,
+        try:
+            if lst is None:
+                lst = self.s3.read_csv_from_folder(
+                    self.good_data_train_dir,
+                    self.train_data_bucket,
+                    self.train_db_insert_log,
+                    skip_large_files=True,
+                )
+
+                lst += [
+                    (None, f["key"], f["key"].split("/")[-1])
+                    for f in self.s3.get_large_files_from_folder(
+                        self.good_data_train_dir,
+                        self.train_data_bucket,
+                        self.train_db_insert_log,
                     )
+                ]
+
+            ingest_mode = self.mongo.ingest_mode
+
+            inserted_files = []
+
+            if ingest_mode in ("skip", "upsert"):
+                self.mongo.create_source_indexes(
+                    good_data_db_name,
+                    good_data_collection_name,
+                    self.train_db_insert_log,
+                )
+
+            for df, file, abs_f in lst:
+                if file.endswith((".csv", ".parquet")):
+                    source = self.get_source(file, manifest)
+
+                    if ingest_mode == "skip" and self.mongo.has_source(
+                        good_data_db_name,
+                        good_data_collection_name,
+                        source,
+                        self.train_db_insert_log,
+                    ):
+                        self.log_writer.log(
+                            self.train_db_insert_log,
+                            f"Skipped {file}, its source is already in the collection",
+                        )
+
+                        inserted_files.append(file)
+
+                        continue
+
+                    if ingest_mode == "skip":
+                        self.mongo.delete_source_records(
+                            good_data_db_name,
+                            good_data_collection_name,
+                            source,
+                            self.train_db_insert_log,
+                        )
+
+                    chunks = (
+                        [df]
+                        if df is not None
+                        else self.s3.iter_frame_chunks(
+                            file, self.train_data_bucket, self.train_db_insert_log
+                        )
+                    )
+
+                    for chunk in chunks:
+                        if ingest_mode == "upsert":
+                            self.mongo.upsert_dataframe_as_record(
+                                chunk,
+                                db_name=good_data_db_name,
+                                collection_name=good_data_collection_name,
+                                source=source,
+                                log_file=self.train_db_insert_log,
+                            )
+
+                        else:
+                            self.mongo.insert_dataframe_as_record(
+                                chunk,
+                                db_name=good_data_db_name,
+                                collection_name=good_data_collection_name,
+                                log_file=self.train_db_insert_log,
+                                source=source,
+                            )
+
+                    if ingest_mode in ("skip", "upsert"):
+                        self.mongo.delete_stale_source_records(
+                            good_data_db_name,
+                            good_data_collection_name,
+                            source,
+                            self.train_db_insert_log,
+                        )
+
+                        self.mongo.mark_source(
+                            good_data_db_name,
+                            good_data_collection_name,
+                            source,
+                            self.train_db_insert_log,
+                        )
+
+                    inserted_files.append(file)
 
                 else:
                     pass
@@ -84,48 +229,124 @@ class DB_Operation_Train:
                 "exit", self.class_name, method_name, self.train_db_insert_log,
             )
 
+            return inserted_files
+
         except Exception as e:
             self.log_writer.exception_log(
                 e, self.class_name, method_name, self.train_db_insert_log,
             )
 
-    def export_collection_to_csv(self, good_data_db_name, good_data_collection_name):
+    def get_columns_to_drop(self, good_data_db_name, good_data_collection_name):
         """
-        Method Name :   export_collection_to_csv
-        Description :   This method inserts the good data in MongoDB as collection
+        Method Name :   get_columns_to_drop
+        Description :   This method finds the columns of the good data collection with zero standard deviation,
+                        from the stats of the collection computed in the database. The upsert key and the target
+                        column are never dropped
 
-        Output      :   A csv file stored in input files bucket, containing good data which was stored in MongoDB
+        Output      :   A list of columns to drop is returned
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.export_collection_to_csv.__name__
+        method_name = self.get_columns_to_drop.__name__
 
         self.log_writer.start_log(
-            "start", self.class_name, method_name, self.train_export_csv_log,
+            "start", self.class_name, method_name, self.train_export_log,
         )
 
         try:
-            df = self.mongo.get_collection_as_dataframe(
-                db_name=good_data_db_name,
-                collection_name=good_data_collection_name,
-                log_file=self.train_export_csv_log,
+            stats = self.mongo.get_collection_stats(
+                good_data_db_name, good_data_collection_name, self.train_export_log
+            )
+
+            cols_to_drop = self.mongo.get_zero_std_columns(
+                stats, self.mongo.field_columns
             )
 
-            self.s3.upload_df_as_csv(
-                df,
-                self.train_export_csv_file,
-                self.train_export_csv_file,
-                self.input_files_bucket,
-                self.input_files_bucket,
+            self.log_writer.log(
+                self.train_export_log,
+                f"Found {int((stats['null_count'] > 0).sum())} columns with missing values and {len(cols_to_drop)} columns with zero standard deviation",
             )
 
             self.log_writer.start_log(
-                "exit", self.class_name, method_name, self.train_export_csv_log,
+                "exit", self.class_name, method_name, self.train_export_log,
+            )
+
+            return cols_to_drop
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.train_export_log,
+            )
+
+    def export_collection(self, good_data_db_name, good_data_collection_name):
+        """
+        Method Name :   export_collection
+        Description :   This method exports the good data collection of MongoDB to the input files bucket. With
+                        stream_export set, the collection is read chunk by chunk from a cursor and every chunk is
+                        written to a multipart upload as it arrives. With server_stats set, the columns with zero
+                        standard deviation are found from the stats of the collection computed in the database,
+                        and projected away in the export, so they are never downloaded. Server stats are off
+                        for the packed layout, whose sensor vectors can not be aggregated in the database
+
+        Output      :   A file in the intermediate format stored in input files bucket, containing good data which was stored in MongoDB
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.export_collection.__name__
+
+        self.log_writer.start_log(
+            "start", self.class_name, method_name, self.train_export_log,
+        )
+
+        try:
+            exclude_fields = list(self.mongo.source_fields)
+
+            if self.server_stats is True:
+                cols_to_drop = self.get_columns_to_drop(
+                    good_data_db_name, good_data_collection_name
+                )
+
+                exclude_fields += cols_to_drop
+
+            if self.stream_export is True:
+                chunks = self.mongo.iter_collection_chunks(
+                    db_name=good_data_db_name,
+                    collection_name=good_data_collection_name,
+                    log_file=self.train_export_log,
+                    exclude_fields=exclude_fields,
+                )
+
+                self.s3.upload_frames_as_stream(
+                    chunks,
+                    self.train_export_file,
+                    self.input_files_bucket,
+                    self.train_export_log,
+                )
+
+            else:
+                df = self.mongo.get_collection_as_dataframe(
+                    db_name=good_data_db_name,
+                    collection_name=good_data_collection_name,
+                    log_file=self.train_export_log,
+                    exclude_fields=exclude_fields,
+                )
+
+                self.s3.upload_frame(
+                    df,
+                    self.train_export_file,
+                    self.input_files_bucket,
+                    self.train_export_log,
+                )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.train_export_log,
             )
 
         except Exception as e:
             self.log_writer.exception_log(
-                e, self.class_name, method_name, self.train_export_csv_log,
+                e, self.class_name, method_name, self.train_export_log,
             )
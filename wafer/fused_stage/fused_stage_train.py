@@ -0,0 +1,282 @@
+from utils.logger import App_Logger
+from utils.read_params import read_params
+from utils.run_utils import get_run_dir
+from utils.schema_utils import get_schema_dtypes
+from wafer.raw_data_validation.null_profile import (
+    get_bad_file_reason,
+    get_null_profile,
+    get_null_profile_from_counts,
+    update_null_counts,
+)
+from wafer.data_transform.data_transformation_train import Data_Transform_Train
+from wafer.s3_bucket_operations.s3_operations import S3_Operation
+
+
+class Fused_Stage_Train:
+    """
+    Description :   This class shall be used for validating and transforming the good training data in a
+                    single pass. Every file is read once, and the column length validation, missing values
+                    validation, target column rename and wafer id slicing are done in memory.
+                    The good files are written back in the intermediate format of params.yaml. Large
+                    files are streamed in chunks, so memory does not grow with the size of a file
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, run_id=None):
+        self.config = read_params()
+
+        self.class_name = self.__class__.__name__
+
+        self.s3 = S3_Operation()
+
+        self.data_transform = Data_Transform_Train(run_id)
+
+        self.log_writer = App_Logger()
+
+        self.train_data_bucket = self.config["s3_bucket"]["wafer_train_data"]
+
+        self.good_train_data_dir = get_run_dir(
+            self.config["data"]["train"]["good"], run_id
+        )
+
+        self.bad_train_data_dir = get_run_dir(
+            self.config["data"]["train"]["bad"], run_id
+        )
+
+        self.train_fused_stage_log = self.config["train_db_log"]["fused_stage"]
+
+    def validate_and_transform(
+        self, NumberofColumns, column_names=None, manifest=None
+    ):
+        """
+        Method Name :   validate_and_transform
+        Description :   This method reads every file of the good data folder once, moves the files with wrong
+                        column length or with a column of only missing values to the bad data folder, and
+                        writes back the transformed good files in the intermediate format, with missing values
+                        kept as NaN. With the column names of the schema, the files are parsed with the schema
+                        dtypes. With the validation manifest, the outcome of every bad file and the null
+                        profile of every file are recorded in it. Large files are validated and transformed
+                        in chunks, and are returned without a dataframe
+
+        Output      :   A list of tuple of good dataframes, along with absolute file name and file name is returned,
+                        the dataframes hold the same data as the transformed files when read back
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.validate_and_transform.__name__
+
+        self.log_writer.start_log(
+            "start", self.class_name, method_name, self.train_fused_stage_log,
+        )
+
+        try:
+            lst = self.s3.read_csv_from_folder(
+                self.good_train_data_dir,
+                self.train_data_bucket,
+                self.train_fused_stage_log,
+                dtype=get_schema_dtypes(column_names),
+                skip_large_files=True,
+            )
+
+            bad_file_pairs, good_lst = [], []
+
+            for df, file, abs_f in lst:
+                if not file.endswith(".csv"):
+                    continue
+
+                dest_f = self.bad_train_data_dir + "/" + abs_f
+
+                null_profile = get_null_profile(df)
+
+                if manifest is not None:
+                    manifest.record_null_profile(file, null_profile)
+
+                reason = get_bad_file_reason(df.shape[1], NumberofColumns, null_profile)
+
+                if reason is not None:
+                    bad_file_pairs.append((file, dest_f))
+
+                    if manifest is not None:
+                        manifest.update_outcome(file, "bad", reason)
+
+                    continue
+
+                good_lst.append((df, file, abs_f))
+
+            good_lst = self.data_transform.transform_good_data(
+                good_lst, self.train_fused_stage_log
+            )
+
+            large_files = self.s3.get_large_files_from_folder(
+                self.good_train_data_dir,
+                self.train_data_bucket,
+                self.train_fused_stage_log,
+            )
+
+            replaced_files = []
+
+            for f in large_files:
+                file, abs_f = f["key"], f["key"].split("/")[-1]
+
+                if not file.endswith(".csv"):
+                    continue
+
+                reason, frame_file = self.validate_and_transform_in_chunks(
+                    f,
+                    NumberofColumns,
+                    dtype=get_schema_dtypes(column_names),
+                    manifest=manifest,
+                )
+
+                if reason is not None:
+                    bad_file_pairs.append((file, self.bad_train_data_dir + "/" + abs_f))
+
+                    if manifest is not None:
+                        manifest.update_outcome(file, "bad", reason)
+
+                    continue
+
+                if frame_file != file:
+                    replaced_files.append(file)
+
+                good_lst.append((None, frame_file, frame_file.split("/")[-1]))
+
+            self.s3.delete_files_bulk(
+                replaced_files, self.train_data_bucket, self.train_fused_stage_log,
+            )
+
+            self.s3.move_data_bulk(
+                bad_file_pairs,
+                self.train_data_bucket,
+                self.train_data_bucket,
+                self.train_fused_stage_log,
+            )
+
+            self.log_writer.log(
+                self.train_fused_stage_log,
+                f"Validated and transformed {len(good_lst)} good files, moved {len(bad_file_pairs)} files to bad data folder",
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.train_fused_stage_log,
+            )
+
+            return good_lst
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.train_fused_stage_log,
+            )
+
+    def validate_and_transform_in_chunks(
+        self, f, NumberofColumns, dtype=None, manifest=None
+    ):
+        """
+        Method Name :   validate_and_transform_in_chunks
+        Description :   This method validates and transforms a large file of the good data folder in a single
+                        streamed pass. The column length is validated from the header of the file, the null
+                        counts are updated from every chunk while the transformed chunks are uploaded, and the
+                        upload is only committed when no column has only missing values. When the file does
+                        not parse with the given dtypes, it is streamed again without them
+
+        Output      :   A tuple of the reason why the file is bad, or None if the file is good, and the file
+                        name the transformed file was uploaded as is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.validate_and_transform_in_chunks.__name__
+
+        self.log_writer.start_log(
+            "start", self.class_name, method_name, self.train_fused_stage_log,
+        )
+
+        try:
+            file = f["key"]
+
+            columns = self.s3.read_csv_header(
+                file,
+                self.train_data_bucket,
+                self.train_fused_stage_log,
+                etag=f["etag"],
+            )
+
+            reason = get_bad_file_reason(len(columns), NumberofColumns)
+
+            if reason is not None:
+                self.log_writer.start_log(
+                    "exit", self.class_name, method_name, self.train_fused_stage_log,
+                )
+
+                return reason, None
+
+            state = {}
+
+            def count_nulls(chunks):
+                for df in chunks:
+                    state["rows"], state["null_counts"] = update_null_counts(
+                        state["rows"], state["null_counts"], df
+                    )
+
+                    yield df
+
+            def commit():
+                state["null_profile"] = get_null_profile_from_counts(
+                    state["rows"], state["null_counts"]
+                )
+
+                return get_bad_file_reason(None, None, state["null_profile"]) is None
+
+            def stream(chunk_dtype):
+                state.update(rows=0, null_counts=None)
+
+                chunks = self.s3.iter_csv_chunks(
+                    file,
+                    self.train_data_bucket,
+                    self.train_fused_stage_log,
+                    etag=f["etag"],
+                    dtype=chunk_dtype,
+                )
+
+                return self.data_transform.transform_file_in_chunks(
+                    file,
+                    self.train_fused_stage_log,
+                    chunks=count_nulls(chunks),
+                    commit=commit,
+                )
+
+            try:
+                frame_file = stream(dtype)
+
+            except Exception as e:
+                if dtype is None:
+                    raise e
+
+                self.log_writer.log(
+                    self.train_fused_stage_log,
+                    f"Failed to stream {file} with schema dtypes, streaming without them, Error : {e}",
+                )
+
+                frame_file = stream(None)
+
+            if manifest is not None:
+                manifest.record_null_profile(file, state["null_profile"])
+
+            if frame_file is None:
+                reason = get_bad_file_reason(None, None, state["null_profile"])
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.train_fused_stage_log,
+            )
+
+            return reason, frame_file
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.train_fused_stage_log,
+            )
@@ -1,8 +1,11 @@
-import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pandas as pd
-from pymongo import MongoClient
+from bson.binary import Binary
+from pandas.api.types import is_numeric_dtype
+from pymongo import ASCENDING, MongoClient, UpdateOne
 from utils.logger import App_Logger
 from utils.read_params import read_params
 
@@ -25,6 +28,34 @@ class MongoDB_Operation:
 
         self.client = MongoClient(self.DB_URL)
 
+        self.insert_batch_size = self.config["mongodb"]["insert_batch_size"]
+
+        self.insert_workers = self.config["mongodb"]["insert_workers"]
+
+        self.cursor_batch_size = self.config["mongodb"]["cursor_batch_size"]
+
+        self.export_chunk_rows = self.config["mongodb"]["export_chunk_rows"]
+
+        self.ingest_mode = self.config["mongodb"]["ingest_mode"]
+
+        self.upsert_key = self.config["mongodb"]["upsert_key"]
+
+        self.source_fields = ["source_file", "source_etag"]
+
+        self.layout = self.config["mongodb"]["layout"]
+
+        self.layout_collection = self.config["mongodb"]["layout_collection"]
+
+        self.source_collection = self.config["mongodb"]["source_collection"]
+
+        self.packed_field = "sensors"
+
+        self.field_columns = [self.upsert_key, self.config["target_col"]]
+
+        self.layouts = {}
+
+        self.stats_fields = ["count", "null_count", "mean", "std"]
+
         self.log_writer = App_Logger()
 
     def get_database(self, db_name, log_file):
@@ -85,10 +116,156 @@ class MongoDB_Operation:
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def get_collection_as_dataframe(self, db_name, collection_name, log_file):
+    def iter_collection_chunks(
+        self,
+        db_name,
+        collection_name,
+        log_file,
+        fields=None,
+        chunk_rows=None,
+        exclude_fields=None,
+    ):
+        """
+        Method Name :   iter_collection_chunks
+        Description :   This method reads the selected collection as dataframes of chunk_rows rows. The
+                        documents are fetched from a cursor in batches of cursor_batch_size, with a projection
+                        on the given fields, or without the excluded fields, and without _id, so only one chunk
+                        is held in memory. Every chunk has the columns of the first one, and columns with only
+                        nulls are given float dtype. With the packed layout, the sensor vectors of a chunk are
+                        decoded into one numpy matrix
+
+        Output      :   A generator of dataframes, one for each chunk of the collection
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.iter_collection_chunks.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            database = self.get_database(db_name, log_file)
+
+            collection = database.get_collection(name=collection_name)
+
+            layout = None
+
+            if self.layout == "packed":
+                layout = self.get_layout(db_name, collection_name, log_file)
+
+            projection = {"_id": 0}
+
+            if fields is None and exclude_fields is not None and layout is not None:
+                fields = [col for col in layout["columns"] if col not in exclude_fields]
+
+            if fields is not None and layout is not None:
+                projection[self.packed_field] = 1
+
+                projection.update(
+                    {
+                        field: 1
+                        for field in fields
+                        if field not in layout["packed_columns"]
+                    }
+                )
+
+            elif fields is not None:
+                projection.update({field: 1 for field in fields})
+
+            elif exclude_fields is not None:
+                projection.update({field: 0 for field in exclude_fields})
+
+            if chunk_rows is None:
+                chunk_rows = self.export_chunk_rows
+
+            cursor = collection.find(
+                {}, projection=projection, batch_size=self.cursor_batch_size
+            )
+
+            columns, docs, rows = fields, [], 0
+
+            try:
+                for doc in cursor:
+                    docs.append(doc)
+
+                    if len(docs) == chunk_rows:
+                        df = self.get_chunk_dataframe(docs, columns, layout)
+
+                        columns, docs, rows = list(df.columns), [], rows + len(df)
+
+                        yield df
+
+                if docs or rows == 0:
+                    df = self.get_chunk_dataframe(docs, columns, layout)
+
+                    rows += len(df)
+
+                    yield df
+
+            finally:
+                cursor.close()
+
+            self.log_writer.log(
+                log_file, f"Read {rows} records from {collection_name} collection",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_chunk_dataframe(self, docs, columns=None, layout=None):
+        """
+        Method Name :   get_chunk_dataframe
+        Description :   This method builds the dataframe of a chunk of documents, with the given columns.
+                        Columns with only nulls are given float dtype, as the dtype of missing values is not
+                        kept in the collection. With the packed layout, the sensor vectors of all documents
+                        are joined and read as one float32 matrix, with the column order of the layout
+
+        Output      :   A dataframe of the documents is returned
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        if layout is None:
+            df = pd.DataFrame(docs, columns=columns)
+
+        else:
+            packed_columns = layout["packed_columns"]
+
+            packed = np.frombuffer(
+                bytearray(b"".join(doc.pop(self.packed_field) for doc in docs)),
+                dtype=np.float32,
+            ).reshape(len(docs), len(packed_columns))
+
+            df = pd.concat(
+                [pd.DataFrame(docs), pd.DataFrame(packed, columns=packed_columns)],
+                axis=1,
+            )
+
+            if columns is None:
+                columns = [col for col in layout["columns"] if col in df.columns]
+
+                columns += [col for col in df.columns if col not in columns]
+
+            df = df.reindex(columns=columns)
+
+        null_cols = df.columns[df.isna().all().values & (df.dtypes == object).values]
+
+        df[null_cols] = df[null_cols].astype(float)
+
+        return df
+
+    def get_collection_as_dataframe(
+        self, db_name, collection_name, log_file, fields=None, exclude_fields=None
+    ):
         """
         Method Name :   get_collection_as_dataframe
-        Description :   This method is used for converting the selected collection to dataframe
+        Description :   This method is used for converting the selected collection to dataframe. The collection
+                        is read in chunks from a cursor, with a projection on the given fields or without the
+                        excluded fields
 
         Output      :   A collection is returned from the selected db_name and collection_name
         On Failure  :   Write an exception log and then raise an exception
@@ -102,32 +279,452 @@ class MongoDB_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            database = self.get_database(db_name, log_file)
+            df = pd.concat(
+                self.iter_collection_chunks(
+                    db_name,
+                    collection_name,
+                    log_file,
+                    fields=fields,
+                    exclude_fields=exclude_fields,
+                ),
+                ignore_index=True,
+            )
 
-            collection = database.get_collection(name=collection_name)
+            self.log_writer.log(
+                log_file, "Converted collection to dataframe",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return df
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_collection_columns(self, db_name, collection_name, log_file):
+        """
+        Method Name :   get_collection_columns
+        Description :   This method gets the columns of the selected collection, from the layout of the
+                        collection, or from the fields of one of its documents, without _id and source fields
+
+        Output      :   A list of columns of the collection is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_collection_columns.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            layout = None
+
+            if self.layout == "packed":
+                layout = self.get_layout(db_name, collection_name, log_file)
+
+            if layout is not None:
+                columns = list(layout["columns"])
+
+            else:
+                projection = {"_id": 0}
+
+                projection.update({field: 0 for field in self.source_fields})
+
+                doc = self.get_database(db_name, log_file)[collection_name].find_one(
+                    {}, projection=projection
+                )
+
+                columns = [] if doc is None else list(doc.keys())
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return columns
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_stats_pipeline(self, columns):
+        """
+        Method Name :   get_stats_pipeline
+        Description :   This method builds the aggregation pipeline which computes the count of non null values,
+                        the mean and the sample standard deviation of every column in one $group stage. The
+                        accumulators are named by the position of the column, as column names may not be valid
+                        field names of the output document
+
+        Output      :   The aggregation pipeline is returned
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        group = {"_id": None, "rows": {"$sum": 1}}
+
+        for idx, col in enumerate(columns):
+            field = "$" + col
+
+            group[f"count_{idx}"] = {
+                "$sum": {"$cond": [{"$eq": [{"$ifNull": [field, None]}, None]}, 0, 1]}
+            }
 
-            df = pd.DataFrame(list(collection.find()))
+            group[f"mean_{idx}"] = {"$avg": field}
+
+            group[f"std_{idx}"] = {"$stdDevSamp": field}
+
+        return [{"$group": group}]
+
+    def get_collection_stats(self, db_name, collection_name, log_file, fields=None):
+        """
+        Method Name :   get_collection_stats
+        Description :   This method computes the count, null count, mean and sample standard deviation of every
+                        column of the selected collection, or of the given fields, with one aggregation
+                        pipeline in the database, so the collection is not read to find columns with nulls or
+                        with zero standard deviation. The sensor vectors of the packed layout can not be
+                        aggregated in the database, so collections with the packed layout are not supported
+
+        Output      :   A dataframe with the stats of every column of the collection is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_collection_stats.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            if self.layout == "packed" and self.get_layout(
+                db_name, collection_name, log_file
+            ):
+                raise Exception(
+                    f"Stats of {collection_name} collection can not be computed in the database, it has the packed layout"
+                )
+
+            columns = fields
+
+            if columns is None:
+                columns = self.get_collection_columns(
+                    db_name, collection_name, log_file
+                )
+
+            collection = self.get_database(db_name, log_file)[collection_name]
+
+            result = next(collection.aggregate(self.get_stats_pipeline(columns)), {})
+
+            rows = result.get("rows", 0)
+
+            stats = pd.DataFrame(
+                [
+                    [
+                        result.get(f"count_{idx}", 0),
+                        rows - result.get(f"count_{idx}", 0),
+                        result.get(f"mean_{idx}"),
+                        result.get(f"std_{idx}"),
+                    ]
+                    for idx in range(len(columns))
+                ],
+                index=columns,
+                columns=self.stats_fields,
+            )
 
-            if "_id" in df.columns.to_list():
-                df = df.drop(columns=["_id"], axis=1)
+            stats[["mean", "std"]] = stats[["mean", "std"]].astype(float)
 
             self.log_writer.log(
-                log_file, "Converted collection to dataframe",
+                log_file,
+                f"Computed stats of {len(stats)} columns of {collection_name} collection",
             )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
-            return df
+            return stats
 
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def insert_dataframe_as_record(
+    def get_zero_std_columns(self, stats, exclude_columns=None):
+        """
+        Method Name :   get_zero_std_columns
+        Description :   This method gets the columns with zero standard deviation from the stats of a
+                        collection, other than the excluded columns
+
+        Output      :   A list of columns with zero standard deviation is returned
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        if exclude_columns is None:
+            exclude_columns = []
+
+        return [
+            col
+            for col in stats.index[stats["std"] == 0]
+            if col not in exclude_columns
+        ]
+
+    def get_records_from_dataframe(self, data_frame, log_file):
+        """
+        Method Name :   get_records_from_dataframe
+        Description :   This method converts the dataframe to records which can be encoded as BSON, straight
+                        from the numpy array of every column. Every column is converted to python values in
+                        one call, and missing values are stored as null
+
+        Output      :   A list of dicts, one for each row of the dataframe is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_records_from_dataframe.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            columns = [str(col) for col in data_frame.columns]
+
+            col_values = []
+
+            for col_num in range(data_frame.shape[1]):
+                series = data_frame.iloc[:, col_num]
+
+                values = series.to_numpy(dtype=object)
+
+                values[series.isna().to_numpy()] = None
+
+                col_values.append(values.tolist())
+
+            records = [dict(zip(columns, row)) for row in zip(*col_values)]
+
+            self.log_writer.log(
+                log_file, f"Converted dataframe to {len(records)} records",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return records
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_layout(self, db_name, collection_name, log_file):
+        """
+        Method Name :   get_layout
+        Description :   This method gets the layout of a collection stored with the packed layout, from the
+                        layout collection. Layouts are cached once they are read
+
+        Output      :   A dict with the column order and the packed columns is returned, or None if the collection has no layout
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_layout.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            layout_key = (db_name, collection_name)
+
+            if layout_key not in self.layouts:
+                layout = self.get_database(db_name, log_file)[
+                    self.layout_collection
+                ].find_one({"_id": collection_name})
+
+                if layout is not None:
+                    self.layouts[layout_key] = layout
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return self.layouts.get(layout_key)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def save_layout(self, db_name, collection_name, data_frame, log_file):
+        """
+        Method Name :   save_layout
+        Description :   This method saves the layout of a collection from a dataframe, the numeric columns
+                        other than the upsert key and the target column are packed. A layout which is
+                        already saved is kept, so the first writer sets the layout of the collection
+
+        Output      :   The layout of the collection is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.save_layout.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            columns = [str(col) for col in data_frame.columns]
+
+            packed_columns = [
+                str(col)
+                for col in data_frame.columns
+                if col not in self.field_columns and is_numeric_dtype(data_frame[col])
+            ]
+
+            self.get_database(db_name, log_file)[self.layout_collection].update_one(
+                {"_id": collection_name},
+                {
+                    "$setOnInsert": {
+                        "columns": columns,
+                        "packed_columns": packed_columns,
+                        "dtype": "float32",
+                    }
+                },
+                upsert=True,
+            )
+
+            self.log_writer.log(
+                log_file,
+                f"Saved layout of {collection_name} collection with {len(packed_columns)} packed columns",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return self.get_layout(db_name, collection_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_packed_records_from_dataframe(
         self, data_frame, db_name, collection_name, log_file
+    ):
+        """
+        Method Name :   get_packed_records_from_dataframe
+        Description :   This method converts the dataframe to records with the packed layout. The packed
+                        columns of every row are stored as one float32 binary vector, in the column order of
+                        the layout, and the other columns are stored as fields
+
+        Output      :   A list of dicts, one for each row of the dataframe is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_packed_records_from_dataframe.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            layout = self.get_layout(db_name, collection_name, log_file)
+
+            if layout is None:
+                layout = self.save_layout(
+                    db_name, collection_name, data_frame, log_file
+                )
+
+            data_frame = data_frame.rename(columns=str)
+
+            field_columns = [
+                col for col in data_frame.columns if col not in layout["packed_columns"]
+            ]
+
+            records = self.get_records_from_dataframe(
+                data_frame[field_columns], log_file
+            )
+
+            packed = np.ascontiguousarray(
+                data_frame.reindex(columns=layout["packed_columns"]).to_numpy(
+                    dtype=np.float32
+                )
+            )
+
+            packed_bytes, row_size = packed.tobytes(), packed.shape[1] * 4
+
+            for idx, record in enumerate(records):
+                record[self.packed_field] = Binary(
+                    packed_bytes[idx * row_size : (idx + 1) * row_size]
+                )
+
+            self.log_writer.log(
+                log_file,
+                f"Packed {packed.shape[1]} columns of {len(records)} records as float32 vectors",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return records
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_layout_records(self, data_frame, db_name, collection_name, log_file):
+        """
+        Method Name :   get_layout_records
+        Description :   This method converts the dataframe to records in the layout set in params.yaml, one
+                        field for each column, or packed sensor vectors
+
+        Output      :   A list of dicts, one for each row of the dataframe is returned
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        if self.layout == "packed":
+            return self.get_packed_records_from_dataframe(
+                data_frame, db_name, collection_name, log_file
+            )
+
+        return self.get_records_from_dataframe(data_frame, log_file)
+
+    def insert_records_in_batches(self, collection, records, log_file):
+        """
+        Method Name :   insert_records_in_batches
+        Description :   This method inserts the records in the collection in batches of insert_batch_size, as
+                        unordered bulk inserts. When more than one insert worker is configured, the batches
+                        are sent concurrently
+
+        Output      :   The records are inserted in the collection and the number of inserted records is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.insert_records_in_batches.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            batches = [
+                records[idx : idx + self.insert_batch_size]
+                for idx in range(0, len(records), self.insert_batch_size)
+            ]
+
+            def insert_batch(batch):
+                return len(collection.insert_many(batch, ordered=False).inserted_ids)
+
+            if self.insert_workers > 1 and len(batches) > 1:
+                with ThreadPoolExecutor(max_workers=self.insert_workers) as executor:
+                    inserted = sum(executor.map(insert_batch, batches))
+
+            else:
+                inserted = sum(insert_batch(batch) for batch in batches)
+
+            self.log_writer.log(
+                log_file,
+                f"Inserted {inserted} records to {collection.name} collection in {len(batches)} batches",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return inserted
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def insert_dataframe_as_record(
+        self, data_frame, db_name, collection_name, log_file, source=None
     ):
         """
         Method Name :   insert_dataframe_as_record
-        Description :   This method inserts the dataframe as record in database collection
+        Description :   This method inserts the dataframe as record in database collection. The records are
+                        built from the numpy columns of the dataframe, in the layout set in params.yaml, and
+                        inserted in unordered batches. When the source is given, every record is tagged with its
+                        source file and etag
 
         Output      :   The dataframe is inserted in database collection
         On Failure  :   Write an exception log and then raise an exception
@@ -140,9 +737,13 @@ class MongoDB_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            records = json.loads(data_frame.T.to_json().values())
+            records = self.get_layout_records(
+                data_frame, db_name, collection_name, log_file
+            )
 
-            self.log_writer.log(log_file, f"Converted dataframe to json records")
+            if source is not None:
+                for record in records:
+                    record.update(source)
 
             database = self.get_database(db_name, log_file)
 
@@ -150,7 +751,7 @@ class MongoDB_Operation:
 
             self.log_writer.log(log_file, "Inserting records to MongoDB")
 
-            collection.insert_many(records)
+            self.insert_records_in_batches(collection, records, log_file)
 
             self.log_writer.log(log_file, "Inserted records to MongoDB")
 
@@ -158,3 +759,264 @@ class MongoDB_Operation:
 
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def create_source_indexes(self, db_name, collection_name, log_file):
+        """
+        Method Name :   create_source_indexes
+        Description :   This method creates the indexes on source file and etag, and on source file and upsert
+                        key, so finding the records of a source or of a row of a source is an index lookup.
+                        Indexes which already exist are left as they are
+
+        Output      :   The source indexes are created on the collection
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.create_source_indexes.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            collection = self.get_database(db_name, log_file)[collection_name]
+
+            collection.create_index(
+                [("source_file", ASCENDING), ("source_etag", ASCENDING)]
+            )
+
+            collection.create_index(
+                [("source_file", ASCENDING), (self.upsert_key, ASCENDING)]
+            )
+
+            self.log_writer.log(
+                log_file, f"Created source indexes on {collection_name} collection",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_source_id(self, collection_name, source):
+        """
+        Method Name :   get_source_id
+        Description :   This method gets the id of the completion marker of a source file in the source
+                        collection
+
+        Output      :   The id of the completion marker is returned
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        return collection_name + "/" + source["source_file"]
+
+    def has_source(self, db_name, collection_name, source, log_file):
+        """
+        Method Name :   has_source
+        Description :   This method checks if a source file with the same etag was completely inserted in the
+                        collection, from its completion marker in the source collection. Records of a source
+                        whose insert failed partway have no marker, so the source is not skipped
+
+        Output      :   True if the source is already in the collection, else False
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.has_source.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            marker = self.get_database(db_name, log_file)[
+                self.source_collection
+            ].find_one(
+                {
+                    "_id": self.get_source_id(collection_name, source),
+                    "source_etag": source["source_etag"],
+                },
+                projection={"_id": 1},
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return marker is not None
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def mark_source(self, db_name, collection_name, source, log_file):
+        """
+        Method Name :   mark_source
+        Description :   This method writes the completion marker of a source file in the source collection,
+                        once all of its records are in the collection. The marker of an earlier version of the
+                        source is replaced
+
+        Output      :   The completion marker of the source is written
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.mark_source.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            self.get_database(db_name, log_file)[self.source_collection].replace_one(
+                {"_id": self.get_source_id(collection_name, source)},
+                dict(source, collection=collection_name),
+                upsert=True,
+            )
+
+            self.log_writer.log(
+                log_file,
+                f"Marked {source['source_file']} as inserted in {collection_name} collection",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def delete_source_records(self, db_name, collection_name, source, log_file):
+        """
+        Method Name :   delete_source_records
+        Description :   This method deletes the records of a source file with the same etag, left in the
+                        collection by an insert which failed partway, so the source is not inserted twice
+
+        Output      :   The records of the source are deleted and their number is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.delete_source_records.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            collection = self.get_database(db_name, log_file)[collection_name]
+
+            result = collection.delete_many(
+                {
+                    "source_file": source["source_file"],
+                    "source_etag": source["source_etag"],
+                }
+            )
+
+            self.log_writer.log(
+                log_file,
+                f"Deleted {result.deleted_count} records of {source['source_file']} from {collection_name} collection",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return result.deleted_count
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def delete_stale_source_records(self, db_name, collection_name, source, log_file):
+        """
+        Method Name :   delete_stale_source_records
+        Description :   This method deletes the records of a source file which were inserted from an earlier
+                        version of the file, with a different etag
+
+        Output      :   The stale records of the source are deleted and their number is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.delete_stale_source_records.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            collection = self.get_database(db_name, log_file)[collection_name]
+
+            result = collection.delete_many(
+                {
+                    "source_file": source["source_file"],
+                    "source_etag": {"$ne": source["source_etag"]},
+                }
+            )
+
+            self.log_writer.log(
+                log_file,
+                f"Deleted {result.deleted_count} stale records of {source['source_file']} from {collection_name} collection",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return result.deleted_count
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def upsert_dataframe_as_record(
+        self, data_frame, db_name, collection_name, source, log_file
+    ):
+        """
+        Method Name :   upsert_dataframe_as_record
+        Description :   This method upserts the dataframe as records in database collection, keyed by source
+                        file and upsert key. The upserts are sent as unordered bulk writes in batches of
+                        insert_batch_size, concurrently when more than one insert worker is configured
+
+        Output      :   The dataframe is upserted in database collection
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.upsert_dataframe_as_record.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            records = self.get_layout_records(
+                data_frame, db_name, collection_name, log_file
+            )
+
+            collection = self.get_database(db_name, log_file)[collection_name]
+
+            requests = [
+                UpdateOne(
+                    {
+                        "source_file": source["source_file"],
+                        self.upsert_key: record[self.upsert_key],
+                    },
+                    {"$set": dict(record, **source)},
+                    upsert=True,
+                )
+                for record in records
+            ]
+
+            batches = [
+                requests[idx : idx + self.insert_batch_size]
+                for idx in range(0, len(requests), self.insert_batch_size)
+            ]
+
+            def write_batch(batch):
+                result = collection.bulk_write(batch, ordered=False)
+
+                return result.upserted_count + result.modified_count
+
+            if self.insert_workers > 1 and len(batches) > 1:
+                with ThreadPoolExecutor(max_workers=self.insert_workers) as executor:
+                    written = sum(executor.map(write_batch, batches))
+
+            else:
+                written = sum(write_batch(batch) for batch in batches)
+
+            self.log_writer.log(
+                log_file,
+                f"Upserted {written} records of {source['source_file']} to {collection_name} collection",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+
+def classify_file_names(
+    fnames, regex, LengthOfDateStampInFile, LengthOfTimeStampInFile
+):
+    """
+    Method Name :   classify_file_names
+    Description :   This method classifies a batch of raw file names based on regex pattern and schema values,
+                    with vectorized string operations over the whole batch instead of a check per file name
+
+    Output      :   A list of good file names, and a list of tuple of bad file name and reason is returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = classify_file_names.__name__
+
+    try:
+        fname_series = pd.Series(fnames, dtype=object)
+
+        stamps = fname_series.str.split(".csv", n=1).str[0].str.split("_")
+
+        reasons = np.select(
+            [
+                ~fname_series.str.match(regex).astype(bool),
+                stamps.str[1].str.len() != LengthOfDateStampInFile,
+                stamps.str[2].str.len() != LengthOfTimeStampInFile,
+            ],
+            [
+                "invalid file name",
+                "invalid length of date stamp",
+                "invalid length of time stamp",
+            ],
+            default="",
+        )
+
+        good_fnames = [fname for fname, reason in zip(fnames, reasons) if not reason]
+
+        bad_fnames = [
+            (fname, str(reason)) for fname, reason in zip(fnames, reasons) if reason
+        ]
+
+        return good_fnames, bad_fnames
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
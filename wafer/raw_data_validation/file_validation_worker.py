@@ -0,0 +1,81 @@
+from wafer.raw_data_validation.null_profile import (
+    get_bad_file_reason,
+    get_chunked_null_profile,
+    get_null_profile,
+)
+from wafer.s3_bucket_operations.s3_operations import S3_Operation
+
+s3 = None
+
+
+def get_s3_operation():
+    """
+    Method Name :   get_s3_operation
+    Description :   This method gets the s3 operation of the worker process, it is created once per process
+
+    Output      :   The s3 operation of the worker process is returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    global s3
+
+    method_name = get_s3_operation.__name__
+
+    try:
+        if s3 is None:
+            s3 = S3_Operation()
+
+        return s3
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
+
+
+def validate_file(fname, bucket, NumberofColumns, log_file, etag=None, chunked=False):
+    """
+    Method Name :   validate_file
+    Description :   This method validates the column length and the missing values in columns of a file. It
+                    runs in a worker process, which reads the file itself, so no dataframe is sent between
+                    processes. With chunked, the file is read in chunks and only one chunk is held in memory.
+                    A csv file without rows gives no chunks, so its column count is taken from its header
+
+    Output      :   The reason why the file is bad, or None if the file is good, and the null profile of the
+                    file are returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = validate_file.__name__
+
+    try:
+        s3_op = get_s3_operation()
+
+        if chunked is True:
+            null_profile = get_chunked_null_profile(
+                s3_op.iter_frame_chunks(fname, bucket, log_file, etag=etag)
+            )
+
+        else:
+            df = s3_op.read_frame(fname, bucket, log_file, etag=etag)
+
+            null_profile = get_null_profile(df)
+
+        columns = null_profile["columns"]
+
+        if chunked is True and null_profile["rows"] == 0 and fname.endswith(".csv"):
+            columns = len(s3_op.read_csv_header(fname, bucket, log_file, etag=etag))
+
+        return (
+            get_bad_file_reason(columns, NumberofColumns, null_profile),
+            null_profile,
+        )
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
@@ -0,0 +1,152 @@
+import pandas as pd
+
+
+def get_null_profile_from_counts(rows, null_counts):
+    """
+    Method Name :   get_null_profile_from_counts
+    Description :   This method builds the null profile from the row count and the missing value count of
+                    every column. A file without rows may give no chunks, so no counts, its profile has no
+                    rows and no columns
+
+    Output      :   A dict of row count, column count, columns with only missing values and null ratio of the
+                    columns with missing values is returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_null_profile_from_counts.__name__
+
+    try:
+        if null_counts is None:
+            null_counts = pd.Series(dtype="int64")
+
+        all_null_columns = null_counts.index[null_counts == rows].tolist()
+
+        missing_counts = null_counts[null_counts > 0]
+
+        null_profile = {
+            "rows": rows,
+            "columns": len(null_counts),
+            "all_null_columns": all_null_columns,
+            "null_ratios": {
+                col: round(count / rows, 4) for col, count in missing_counts.items()
+            },
+        }
+
+        return null_profile
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
+
+
+def get_null_profile(df):
+    """
+    Method Name :   get_null_profile
+    Description :   This method computes the null profile of a dataframe with a single isna reduction, instead
+                    of counting the missing values of every column separately
+
+    Output      :   A dict of row count, column count, columns with only missing values and null ratio of the
+                    columns with missing values is returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_null_profile.__name__
+
+    try:
+        return get_null_profile_from_counts(len(df), df.isna().sum())
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
+
+
+def update_null_counts(rows, null_counts, df):
+    """
+    Method Name :   update_null_counts
+    Description :   This method adds the row count and the missing value counts of a chunk of a file to the
+                    counts of the chunks before it. The counts of the first chunk are passed as 0 and None
+
+    Output      :   A tuple of the updated row count and missing value counts is returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = update_null_counts.__name__
+
+    try:
+        chunk_counts = df.isna().sum()
+
+        if null_counts is not None:
+            chunk_counts = null_counts.add(chunk_counts, fill_value=0)
+
+        return rows + len(df), chunk_counts
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
+
+
+def get_chunked_null_profile(chunks):
+    """
+    Method Name :   get_chunked_null_profile
+    Description :   This method computes the null profile of a file from its chunks, only one chunk is held
+                    in memory at a time
+
+    Output      :   The null profile of the file is returned, the same as get_null_profile of the whole file
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_chunked_null_profile.__name__
+
+    try:
+        rows, null_counts = 0, None
+
+        for df in chunks:
+            rows, null_counts = update_null_counts(rows, null_counts, df)
+
+        return get_null_profile_from_counts(rows, null_counts)
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
+
+
+def get_bad_file_reason(columns, NumberofColumns, null_profile=None):
+    """
+    Method Name :   get_bad_file_reason
+    Description :   This method gets the reason why a file is bad, with the same order of checks in every
+                    validation path. The column count is checked first, then the rows and the missing values
+                    of the null profile. The column count is not checked when columns is None, for files
+                    whose column count was validated before, and only the column count is checked when the
+                    null profile is None
+
+    Output      :   The reason why the file is bad is returned, or None if the file is good
+    On Failure  :   Raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    if columns is not None and columns != NumberofColumns:
+        return "invalid number of columns"
+
+    if null_profile is None:
+        return None
+
+    if null_profile["rows"] == 0:
+        return "empty file"
+
+    if null_profile["all_null_columns"]:
+        return "missing values in column"
+
+    return None
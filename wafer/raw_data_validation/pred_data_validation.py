@@ -1,7 +1,18 @@
-import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 from utils.logger import App_Logger
 from utils.read_params import read_params
+from utils.run_utils import get_run_dir
+from utils.schema_utils import Schema_Cache
+from wafer.raw_data_validation.file_name_classifier import classify_file_names
+from wafer.raw_data_validation.file_validation_worker import validate_file
+from wafer.raw_data_validation.null_profile import (
+    get_bad_file_reason,
+    get_chunked_null_profile,
+    get_null_profile,
+)
+from wafer.raw_data_validation.validation_manifest import Validation_Manifest
 from wafer.s3_bucket_operations.s3_operations import S3_Operation
 
 
@@ -14,17 +25,21 @@ class Raw_Pred_Data_Validation:
     Revisions   :   Moved to setup to cloud 
     """
 
-    def __init__(self, raw_data_bucket):
+    def __init__(self, raw_data_bucket, run_id=None):
         self.config = read_params()
 
         self.raw_data_bucket = raw_data_bucket
 
+        self.run_id = run_id
+
         self.log_writer = App_Logger()
 
         self.class_name = self.__class__.__name__
 
         self.s3 = S3_Operation()
 
+        self.schema_cache = Schema_Cache()
+
         self.pred_data_bucket = self.config["s3_bucket"]["wafer_pred_data"]
 
         self.input_files_bucket = self.config["s3_bucket"]["input_files"]
@@ -37,9 +52,13 @@ class Raw_Pred_Data_Validation:
 
         self.pred_schema_log = self.config["pred_db_log"]["values_from_schema"]
 
-        self.good_pred_data_dir = self.config["data"]["pred"]["good"]
+        self.good_pred_data_dir = get_run_dir(
+            self.config["data"]["pred"]["good"], run_id
+        )
 
-        self.bad_pred_data_dir = self.config["data"]["pred"]["bad"]
+        self.bad_pred_data_dir = get_run_dir(
+            self.config["data"]["pred"]["bad"], run_id
+        )
 
         self.pred_gen_log = self.config["pred_db_log"]["general"]
 
@@ -51,6 +70,17 @@ class Raw_Pred_Data_Validation:
             "missing_values_in_col"
         ]
 
+        self.header_probe = self.config["validation"]["header_probe"]
+
+        self.header_probe_bytes = self.config["validation"]["header_probe_bytes"]
+
+        self.process_workers = self.config["validation"]["process_workers"]
+
+        self.manifest = Validation_Manifest(
+            self.config["manifest_file"]["pred"],
+            self.config["quality_report_file"]["pred"],
+        )
+
     def values_from_schema(self):
         """
         Method Name :   values_from_schema
@@ -69,8 +99,8 @@ class Raw_Pred_Data_Validation:
         )
 
         try:
-            dic = self.s3.read_json(
-                self.pred_schema_file, self.input_files_bucket, self.pred_schema_log,
+            dic = self.schema_cache.get_schema(
+                self.pred_schema_file, self.pred_schema_log,
             )
 
             LengthOfDateStampInFile = dic["LengthOfDateStampInFile"]
@@ -113,9 +143,9 @@ class Raw_Pred_Data_Validation:
     def get_regex_pattern(self):
         """
         Method Name :   get_regex_pattern
-        Description :   This method gets regex pattern from input files s3 bucket
+        Description :   This method gets regex pattern from input files s3 bucket, through the schema cache
 
-        Output      :   A regex pattern is extracted
+        Output      :   A compiled regex pattern is extracted
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
@@ -128,12 +158,10 @@ class Raw_Pred_Data_Validation:
         )
 
         try:
-            regex = self.s3.read_text(
-                self.regex_file, self.input_files_bucket, self.pred_gen_log,
-            )
+            regex = self.schema_cache.get_regex(self.regex_file, self.pred_gen_log)
 
             self.log_writer.log(
-                self.pred_gen_log, f"Got {regex} pattern",
+                self.pred_gen_log, f"Got {regex.pattern} pattern",
             )
 
             self.log_writer.start_log(
@@ -176,12 +204,48 @@ class Raw_Pred_Data_Validation:
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
+    def clean_runs_of_good_bad_data(self, log_file):
+        """
+        Method Name :   clean_runs_of_good_bad_data
+        Description :   This method removes the old run folders of good and bad data folders in s3 bucket,
+                        the folders of the current run are always kept
+
+        Output      :   Old run folders of good and bad data are deleted or archived
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.clean_runs_of_good_bad_data.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            for folder_name in [
+                self.config["data"]["pred"]["good"],
+                self.config["data"]["pred"]["bad"],
+            ]:
+                self.s3.clean_run_folders(
+                    folder_name,
+                    self.pred_data_bucket,
+                    log_file,
+                    keep_run_id=self.run_id,
+                )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
     def validate_raw_file_name(
         self, regex, LengthOfDateStampInFile, LengthOfTimeStampInFile
     ):
         """
         Method Name :   validate_raw_file_name
-        Description :   This method validates the raw file name based on regex pattern and schema values
+        Description :   This method validates the raw file name based on regex pattern and schema values. The
+                        file names are classified as one batch, and routed with a bulk copy. Only the files
+                        which were copied are recorded in the manifest, the rest are validated again in the
+                        next run
 
         Output      :   Raw file names are validated, good file names are stored in good data folder and rest is stored in bad data
         On Failure  :   Write an exception log and then raise an exception
@@ -198,67 +262,80 @@ class Raw_Pred_Data_Validation:
         try:
             self.create_dirs_for_good_bad_data(self.pred_name_valid_log)
 
-            onlyfiles = self.s3.get_files_from_folder(
-                self.raw_data_bucket, self.raw_pred_data_dir, self.pred_name_valid_log,
-            )
+            self.manifest.load_manifest(self.pred_name_valid_log)
 
-            pred_batch_files = [f.split("/")[1] for f in onlyfiles]
+            pred_batch_files = [
+                f
+                for f in self.s3.iter_files_from_folder(
+                    self.raw_pred_data_dir,
+                    self.raw_data_bucket,
+                    self.pred_name_valid_log,
+                )
+                if not f["key"].endswith("/")
+            ]
+
+            new_files = [
+                f
+                for f in pred_batch_files
+                if not self.manifest.is_processed(f["key"], f["etag"])
+            ]
 
             self.log_writer.log(
                 self.pred_name_valid_log,
-                "Got Prediction files with absolute file name",
+                f"Got {len(new_files)} new Prediction files, skipped {len(pred_batch_files) - len(new_files)} files validated in earlier runs",
             )
 
-            for fname in pred_batch_files:
-                raw_data_pred_fname = self.raw_pred_data_dir + "/" + fname
+            fnames = [f["key"].split("/")[1] for f in new_files]
 
-                good_data_pred_fname = self.good_pred_data_dir + "/" + fname
+            etags = {fname: f["etag"] for fname, f in zip(fnames, new_files)}
 
-                bad_data_pred_file_name = self.bad_pred_data_dir + "/" + fname
+            good_fnames, bad_fnames = classify_file_names(
+                fnames, regex, LengthOfDateStampInFile, LengthOfTimeStampInFile
+            )
 
-                self.log_writer.log(
-                    self.pred_name_valid_log, "Created raw,good and bad data file name",
-                )
+            file_pairs, outcomes = [], {}
+
+            for fname in good_fnames:
+                raw_f = self.raw_pred_data_dir + "/" + fname
+
+                file_pairs.append((raw_f, self.good_pred_data_dir + "/" + fname))
+
+                outcomes[raw_f] = (etags[fname], "validated", None)
+
+            for fname, reason in bad_fnames:
+                raw_f = self.raw_pred_data_dir + "/" + fname
+
+                file_pairs.append((raw_f, self.bad_pred_data_dir + "/" + fname))
+
+                outcomes[raw_f] = (etags[fname], "bad", reason)
+
+            reason_counts = Counter(reason for fname, reason in bad_fnames)
+
+            self.log_writer.log(
+                self.pred_name_valid_log,
+                f"Classified {len(fnames)} files, {len(good_fnames)} good, bad by reason : {dict(reason_counts)}",
+            )
+
+            self.log_writer.log(
+                self.pred_name_valid_log,
+                f"Routing {len(file_pairs)} files to good and bad data folders",
+            )
+
+            results = self.s3.copy_data_bulk(
+                file_pairs,
+                self.raw_data_bucket,
+                self.pred_data_bucket,
+                self.pred_name_valid_log,
+            )
+
+            for raw_f, (etag, status, reason) in outcomes.items():
+                if results.get(raw_f) == "success":
+                    self.manifest.record(raw_f, etag, status, reason)
 
-                if re.match(regex, fname):
-                    splitAtDot = re.split(".csv", fname)
-
-                    splitAtDot = re.split("_", splitAtDot[0])
-
-                    if len(splitAtDot[1]) == LengthOfDateStampInFile:
-                        if len(splitAtDot[2]) == LengthOfTimeStampInFile:
-                            self.s3.copy_data(
-                                raw_data_pred_fname,
-                                self.pred_data_bucket,
-                                good_data_pred_fname,
-                                self.pred_data_bucket,
-                                self.pred_name_valid_log,
-                            )
-
-                        else:
-                            self.s3.copy_data(
-                                raw_data_pred_fname,
-                                self.pred_data_bucket,
-                                bad_data_pred_file_name,
-                                self.pred_data_bucket,
-                                self.pred_name_valid_log,
-                            )
-
-                    else:
-                        self.s3.copy_data(
-                            raw_data_pred_fname,
-                            self.pred_data_bucket,
-                            bad_data_pred_file_name,
-                            self.pred_data_bucket,
-                            self.pred_name_valid_log,
-                        )
                 else:
-                    self.s3.copy_data(
-                        raw_data_pred_fname,
-                        self.pred_data_bucket,
-                        bad_data_pred_file_name,
-                        self.pred_data_bucket,
+                    self.log_writer.log(
                         self.pred_name_valid_log,
+                        f"Not recording {raw_f} in the manifest, it was not copied",
                     )
 
             self.log_writer.start_log(
@@ -273,7 +350,9 @@ class Raw_Pred_Data_Validation:
     def validate_col_length(self, NumberofColumns):
         """
         Method Name :   validate_col_length
-        Description :   This method validates the column length based on number of columns as mentioned in schema values
+        Description :   This method validates the column length based on number of columns as mentioned in schema values.
+                        With header_probe set, or for the files which are streamed in chunks, only the header of
+                        a file is fetched with a range read
 
         Output      :   The files' columns length are validated and good data is stored in good data folder and rest is stored in bad data folder
         On Failure  :   Write an exception log and then raise an exception
@@ -288,35 +367,164 @@ class Raw_Pred_Data_Validation:
         )
 
         try:
-            lst = self.s3.read_csv_from_folder(
-                self.good_pred_data_dir, self.pred_data_bucket, self.pred_col_valid_log,
-            )
+            if self.header_probe is True:
+                lst = self.s3.read_csv_headers_from_folder(
+                    self.good_pred_data_dir,
+                    self.pred_data_bucket,
+                    self.pred_col_valid_log,
+                    probe_bytes=self.header_probe_bytes,
+                )
 
-            for idx, f in enumerate(lst):
-                df = f[idx][0]
+            else:
+                lst = [
+                    (df.columns, file, abs_f)
+                    for df, file, abs_f in self.s3.read_csv_from_folder(
+                        self.good_pred_data_dir,
+                        self.pred_data_bucket,
+                        self.pred_col_valid_log,
+                        skip_large_files=True,
+                    )
+                ]
 
-                file = f[idx][1]
+                lst += [
+                    (
+                        self.s3.read_csv_header(
+                            f["key"],
+                            self.pred_data_bucket,
+                            self.pred_col_valid_log,
+                            probe_bytes=self.header_probe_bytes,
+                            etag=f["etag"],
+                        ),
+                        f["key"],
+                        f["key"].split("/")[-1],
+                    )
+                    for f in self.s3.get_large_files_from_folder(
+                        self.good_pred_data_dir,
+                        self.pred_data_bucket,
+                        self.pred_col_valid_log,
+                    )
+                ]
 
-                abs_f = f[idx][2]
+            bad_file_pairs = []
 
+            for columns, file, abs_f in lst:
                 if file.endswith(".csv"):
-                    if df.shape[1] == NumberofColumns:
-                        pass
+                    reason = get_bad_file_reason(len(columns), NumberofColumns)
 
-                    else:
+                    if reason is not None:
                         dest_f = self.bad_pred_data_dir + "/" + abs_f
 
-                        self.s3.move_data(
-                            file,
-                            self.pred_data_bucket,
-                            dest_f,
-                            self.pred_data_bucket,
-                            self.pred_col_valid_log,
-                        )
+                        bad_file_pairs.append((file, dest_f))
+
+                        self.manifest.update_outcome(file, "bad", reason)
 
                 else:
                     pass
 
+            self.s3.move_data_bulk(
+                bad_file_pairs,
+                self.pred_data_bucket,
+                self.pred_data_bucket,
+                self.pred_col_valid_log,
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.pred_col_valid_log,
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.pred_col_valid_log,
+            )
+
+    def validate_files_in_process_pool(self, NumberofColumns):
+        """
+        Method Name :   validate_files_in_process_pool
+        Description :   This method validates the column length and the missing values in columns of the good
+                        data files in a pool of worker processes. Every worker reads the files it validates,
+                        and the results are merged back in the order of the file listing. Large files are read
+                        in chunks by their worker
+
+        Output      :   The files are validated, good data is kept in good data folder and rest is moved to bad data folder
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.validate_files_in_process_pool.__name__
+
+        self.log_writer.start_log(
+            "start", self.class_name, method_name, self.pred_col_valid_log
+        )
+
+        try:
+            files = [
+                f
+                for f in self.s3.iter_files_from_folder(
+                    self.good_pred_data_dir,
+                    self.pred_data_bucket,
+                    self.pred_col_valid_log,
+                )
+                if f["key"].endswith(".csv")
+            ]
+
+            self.log_writer.log(
+                self.pred_col_valid_log,
+                f"Validating {len(files)} files with {self.process_workers} worker processes",
+            )
+
+            with ProcessPoolExecutor(max_workers=self.process_workers) as executor:
+                futures = [
+                    executor.submit(
+                        validate_file,
+                        f["key"],
+                        self.pred_data_bucket,
+                        NumberofColumns,
+                        self.pred_col_valid_log,
+                        f["etag"],
+                        self.s3.is_large_file(f),
+                    )
+                    for f in files
+                ]
+
+                results = []
+
+                for f, future in zip(files, futures):
+                    try:
+                        results.append((f["key"], *future.result()))
+
+                    except Exception as e:
+                        self.log_writer.log(
+                            self.pred_col_valid_log,
+                            f"Failed to validate {f['key']}, Error : {e}",
+                        )
+
+            bad_file_pairs = []
+
+            for file, reason, null_profile in results:
+                self.manifest.record_null_profile(file, null_profile)
+
+                if reason is not None:
+                    dest_f = self.bad_pred_data_dir + "/" + file.split("/")[-1]
+
+                    bad_file_pairs.append((file, dest_f))
+
+                    self.manifest.update_outcome(file, "bad", reason)
+
+            self.s3.move_data_bulk(
+                bad_file_pairs,
+                self.pred_data_bucket,
+                self.pred_data_bucket,
+                self.pred_col_valid_log,
+            )
+
+            reason_counts = Counter(reason for file, reason, _ in results if reason)
+
+            self.log_writer.log(
+                self.pred_col_valid_log,
+                f"Validated {len(results)} files, bad by reason : {dict(reason_counts)}",
+            )
+
             self.log_writer.start_log(
                 "exit", self.class_name, method_name, self.pred_col_valid_log,
             )
@@ -329,7 +537,9 @@ class Raw_Pred_Data_Validation:
     def validate_missing_values_in_col(self):
         """
         Method Name :   validate_missing_values_in_col
-        Description :   This method validates the missing values in columns
+        Description :   This method validates the missing values in columns, with the null profile of every
+                        file. Files without rows or with a column of only missing values are moved in one bulk
+                        call, good files are left as they are. Large files are profiled in chunks
 
         Output      :   Missing columns are validated, and good data is stored in good data folder and rest is to stored in bad data folder
         On Failure  :   Write an exception log and then raise an exception
@@ -348,51 +558,59 @@ class Raw_Pred_Data_Validation:
                 self.good_pred_data_dir,
                 self.pred_data_bucket,
                 self.pred_missing_value_log,
+                skip_large_files=True,
             )
 
-            for idx, f in lst:
-                df = f[idx][0]
+            lst = [(get_null_profile(df), file, abs_f) for df, file, abs_f in lst]
 
-                file = f[idx][1]
+            lst += [
+                (
+                    get_chunked_null_profile(
+                        self.s3.iter_csv_chunks(
+                            f["key"],
+                            self.pred_data_bucket,
+                            self.pred_missing_value_log,
+                            etag=f["etag"],
+                        )
+                    ),
+                    f["key"],
+                    f["key"].split("/")[-1],
+                )
+                for f in self.s3.get_large_files_from_folder(
+                    self.good_pred_data_dir,
+                    self.pred_data_bucket,
+                    self.pred_missing_value_log,
+                )
+            ]
 
-                abs_f = f[idx][2]
+            bad_file_pairs = []
 
+            for null_profile, file, abs_f in lst:
                 if abs_f.endswith(".csv"):
-                    count = 0
-
-                    for cols in df:
-                        if len(df[cols]) - df[cols].count() == len(df[cols]):
-                            count += 1
-
-                            dest_f = self.bad_pred_data_dir + "/" + abs_f
+                    self.manifest.record_null_profile(file, null_profile)
 
-                            self.s3.move_data(
-                                file,
-                                self.pred_data_bucket,
-                                dest_f,
-                                self.pred_data_bucket,
-                                self.pred_missing_value_log,
-                            )
+                    reason = get_bad_file_reason(None, None, null_profile)
 
-                            break
+                    if reason is not None:
+                        dest_f = self.bad_pred_data_dir + "/" + abs_f
 
-                    if count == 0:
-                        dest_f = self.good_pred_data_dir + "/" + abs_f
+                        bad_file_pairs.append((file, dest_f))
 
-                        self.s3.upload_df_as_csv(
-                            df,
-                            abs_f,
-                            dest_f,
-                            self.pred_data_bucket,
-                            self.pred_missing_value_log,
-                        )
+                        self.manifest.update_outcome(file, "bad", reason)
 
                 else:
                     pass
 
-                self.log_writer.start_log(
-                    "exit", self.class_name, method_name, self.pred_missing_value_log,
-                )
+            self.s3.move_data_bulk(
+                bad_file_pairs,
+                self.pred_data_bucket,
+                self.pred_data_bucket,
+                self.pred_missing_value_log,
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.pred_missing_value_log,
+            )
 
         except Exception as e:
             self.log_writer.exception_log(
@@ -0,0 +1,376 @@
+import json
+import os
+from io import BytesIO
+
+from botocore.exceptions import ClientError
+from utils.logger import App_Logger
+from utils.read_params import read_params
+from wafer.s3_bucket_operations.s3_operations import S3_Operation
+
+
+class Validation_Manifest:
+    """
+    Description :   This class shall be used for keeping a manifest of the validated raw files in the input
+                    files bucket. Every raw file is keyed by its name and etag, with the outcome of its
+                    validation, so later runs only validate new or changed files. A good file is only marked
+                    good once its records are in MongoDB, so a file which failed to be read or inserted is
+                    validated again in the next run. The null profile of every
+                    validated file is kept in a quality report next to the manifest. Both files are saved
+                    only if they were not changed since they were loaded, otherwise the outcomes of this
+                    run are merged into the changed files, so overlapping runs keep each other's outcomes
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, manifest_file, quality_report_file):
+        self.config = read_params()
+
+        self.class_name = self.__class__.__name__
+
+        self.s3 = S3_Operation()
+
+        self.log_writer = App_Logger()
+
+        self.input_files_bucket = self.config["s3_bucket"]["input_files"]
+
+        self.enabled = self.config["validation"]["manifest"]
+
+        self.save_attempts = self.config["validation"]["manifest_save_attempts"]
+
+        self.manifest_file = manifest_file
+
+        self.quality_report_file = quality_report_file
+
+        self.manifest = {}
+
+        self.quality_report = {}
+
+        self.pending = {}
+
+        self.etags = {}
+
+    def load_json_file(self, fname, log_file):
+        """
+        Method Name :   load_json_file
+        Description :   This method loads a json file from the input files bucket, a missing file is loaded
+                        as an empty dict. The file is read conditional on the etag of its head, so the etag
+                        which is kept for a conditional save of it is the etag of the content read. A file
+                        which was changed between the head and the read is loaded again
+
+        Output      :   The content of the json file is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.load_json_file.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            for _ in range(self.save_attempts):
+                try:
+                    etag = self.s3.load_object(
+                        fname, self.input_files_bucket, log_file
+                    )["ETag"]
+
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "404":
+                        raise e
+
+                    etag, dic = None, {}
+
+                    break
+
+                try:
+                    dic = self.s3.read_json(
+                        fname, self.input_files_bucket, log_file, etag=etag
+                    )
+
+                    break
+
+                except Exception as e:
+                    head = self.s3.load_object(fname, self.input_files_bucket, log_file)
+
+                    if head["ETag"] == etag:
+                        raise e
+
+                    self.log_writer.log(
+                        log_file,
+                        f"{fname} was changed by another run while loading it, loading it again",
+                    )
+
+            else:
+                raise Exception(
+                    f"{fname} was changed by other runs in {self.save_attempts} attempts"
+                )
+
+            self.etags[fname] = etag
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return dic
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def load_manifest(self, log_file):
+        """
+        Method Name :   load_manifest
+        Description :   This method loads the manifest and the quality report from the input files bucket,
+                        missing files are loaded as empty ones
+
+        Output      :   The manifest and the quality report are loaded
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.load_manifest.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            self.manifest, self.quality_report, self.pending = {}, {}, {}
+
+            if self.enabled is True:
+                self.manifest = self.load_json_file(self.manifest_file, log_file)
+
+                self.quality_report = self.load_json_file(
+                    self.quality_report_file, log_file
+                )
+
+                self.log_writer.log(
+                    log_file,
+                    f"Loaded manifest {self.manifest_file} with {len(self.manifest)} files",
+                )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def is_processed(self, raw_fname, etag):
+        """
+        Method Name :   is_processed
+        Description :   This method checks if the raw file was processed in an earlier run, with the same etag.
+                        Only files which were inserted as good or moved to bad data are processed, files left
+                        as validated or error are processed again
+
+        Output      :   True if the raw file was processed before, else False
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        if self.enabled is not True:
+            return False
+
+        entry = self.manifest.get(raw_fname)
+
+        return (
+            entry is not None
+            and entry["etag"] == etag
+            and entry["status"] in ("good", "bad")
+        )
+
+    def get_pending_key(self, fname):
+        """
+        Method Name :   get_pending_key
+        Description :   This method gets the key of a file recorded in this run, its file name without folder
+                        and extension, so the raw, good, bad and transformed files of it share the same key
+
+        Output      :   The key of the file is returned
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        return os.path.splitext(fname.split("/")[-1])[0]
+
+    def get_source_etag(self, fname):
+        """
+        Method Name :   get_source_etag
+        Description :   This method gets the etag of the raw file of a file recorded in this run, by its file
+                        name in the good or bad data folder
+
+        Output      :   The etag of the raw file is returned, or None if the file was not recorded in this run
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        raw_fname = self.pending.get(self.get_pending_key(fname))
+
+        if raw_fname is None:
+            return None
+
+        return self.manifest[raw_fname]["etag"]
+
+    def record(self, raw_fname, etag, status, reason=None):
+        """
+        Method Name :   record
+        Description :   This method records the outcome of the validation of a raw file in this run
+
+        Output      :   The outcome of the raw file is recorded in the manifest
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        self.pending[self.get_pending_key(raw_fname)] = raw_fname
+
+        self.manifest[raw_fname] = {"etag": etag, "status": status, "reason": reason}
+
+    def update_outcome(self, fname, status, reason=None):
+        """
+        Method Name :   update_outcome
+        Description :   This method updates the outcome of a file recorded in this run, by its file name in
+                        the good or bad data folder
+
+        Output      :   The outcome of the raw file is updated in the manifest
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        raw_fname = self.pending.get(self.get_pending_key(fname))
+
+        if raw_fname is not None:
+            self.manifest[raw_fname].update({"status": status, "reason": reason})
+
+    def record_inserted(self, inserted_files):
+        """
+        Method Name :   record_inserted
+        Description :   This method marks the files recorded in this run whose records are in MongoDB as good.
+                        Files still left as validated were not read or inserted, and are marked as error, so
+                        they are processed again in the next run
+
+        Output      :   The outcome of the inserted files is updated in the manifest
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        for fname in inserted_files:
+            self.update_outcome(fname, "good")
+
+        for raw_fname in self.pending.values():
+            if self.manifest[raw_fname]["status"] == "validated":
+                self.manifest[raw_fname].update(
+                    {"status": "error", "reason": "not inserted"}
+                )
+
+    def record_null_profile(self, fname, null_profile):
+        """
+        Method Name :   record_null_profile
+        Description :   This method records the null profile of a file recorded in this run in the quality
+                        report, by its file name in the good or bad data folder
+
+        Output      :   The null profile of the raw file is recorded in the quality report
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        raw_fname = self.pending.get(self.get_pending_key(fname))
+
+        if raw_fname is not None:
+            self.quality_report[raw_fname] = dict(
+                etag=self.manifest[raw_fname]["etag"], **null_profile
+            )
+
+    def save_json_file(self, fname, dic, log_file):
+        """
+        Method Name :   save_json_file
+        Description :   This method saves a json file to the input files bucket, only if it still has the etag
+                        it was loaded with. When another run changed it, the file is loaded again and the
+                        entries of the files recorded in this run are merged into it, before saving it again
+
+        Output      :   The saved dict is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.save_json_file.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            for _ in range(self.save_attempts):
+                etag = self.s3.upload_buffer_if_match(
+                    BytesIO(json.dumps(dic).encode()),
+                    fname,
+                    self.input_files_bucket,
+                    log_file,
+                    etag=self.etags.get(fname),
+                )
+
+                if etag is not None:
+                    self.etags[fname] = etag
+
+                    self.log_writer.start_log(
+                        "exit", self.class_name, method_name, log_file
+                    )
+
+                    return dic
+
+                self.log_writer.log(
+                    log_file, f"{fname} was changed by another run, merging with it",
+                )
+
+                remote_dic = self.load_json_file(fname, log_file)
+
+                dic = dict(
+                    remote_dic,
+                    **{
+                        raw_fname: dic[raw_fname]
+                        for raw_fname in self.pending.values()
+                        if raw_fname in dic
+                    },
+                )
+
+            raise Exception(
+                f"{fname} was changed by other runs in {self.save_attempts} attempts"
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def save_manifest(self, log_file):
+        """
+        Method Name :   save_manifest
+        Description :   This method saves the manifest and the quality report to the input files bucket, with
+                        conditional writes which merge with the changes of overlapping runs
+
+        Output      :   The manifest and the quality report are saved as json files in input files bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.save_manifest.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            if self.enabled is True:
+                self.manifest = self.save_json_file(
+                    self.manifest_file, self.manifest, log_file
+                )
+
+                self.quality_report = self.save_json_file(
+                    self.quality_report_file, self.quality_report, log_file
+                )
+
+                self.log_writer.log(
+                    log_file,
+                    f"Saved manifest {self.manifest_file} with {len(self.pending)} new files",
+                )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
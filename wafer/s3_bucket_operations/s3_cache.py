@@ -0,0 +1,279 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+
+from utils.logger import App_Logger
+from utils.read_params import read_params
+
+
+class S3_Cache:
+    """
+    Description :   This class is used for caching the content of s3 objects on local disk, keyed by
+                    bucket, key and etag. The metadata of every object is kept in a file next to its content,
+                    so a cache hit only touches the files of that object. The cache is bounded in size and
+                    evicts the least recently used objects first. Writes are serialized with a file lock, as
+                    the cache directory is shared by threads and worker processes
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self, config=None):
+        self.config = read_params() if config is None else config
+
+        self.cache_dir = self.config["s3_cache"]["cache_dir"]
+
+        self.max_size = self.config["s3_cache"]["max_size_mb"] * 1024 ** 2
+
+        self.lock_file = os.path.join(self.cache_dir, ".lock")
+
+        self.log_writer = App_Logger()
+
+        self.class_name = self.__class__.__name__
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_cache_file(self, cache_key, etag=None):
+        """
+        Method Name :   get_cache_file
+        Description :   This method gets the path of the content file of a cached object version, or of the
+                        metadata file of the object when no etag is given
+
+        Output      :   The path of the cache file is returned
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        if etag is None:
+            return os.path.join(
+                self.cache_dir, hashlib.sha1(cache_key.encode()).hexdigest() + ".json"
+            )
+
+        return os.path.join(
+            self.cache_dir, hashlib.sha1((cache_key + "/" + etag).encode()).hexdigest()
+        )
+
+    def write_file(self, cache_file, content):
+        """
+        Method Name :   write_file
+        Description :   This method atomically writes a file in the cache directory, through a temporary
+                        file of the process and thread
+
+        Output      :   The content is written to the cache file
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        tmp_cache_file = cache_file + f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with open(tmp_cache_file, "wb") as f:
+            f.write(content)
+
+        os.replace(tmp_cache_file, cache_file)
+
+    def get_entry(self, bucket, key, log_file):
+        """
+        Method Name :   get_entry
+        Description :   This method gets the cache entry of the object from its metadata file, and marks its
+                        content as recently used
+
+        Output      :   A dict with etag and file of the cached object is returned, or None
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_entry.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            try:
+                with open(self.get_cache_file(bucket + "/" + key)) as f:
+                    entry = json.load(f)
+
+                os.utime(entry["file"])
+
+            except (OSError, ValueError):
+                entry = None
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return entry
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def read_entry(self, entry, log_file):
+        """
+        Method Name :   read_entry
+        Description :   This method reads the content of a cached object from local disk. A content file
+                        which was evicted since the entry was got is a cache miss
+
+        Output      :   The content of the cached object is returned as bytes, or None
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.read_entry.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            try:
+                with open(entry["file"], "rb") as f:
+                    content = f.read()
+
+                self.log_writer.log(
+                    log_file,
+                    f"Read {len(content)} bytes from cache file {entry['file']}",
+                )
+
+            except FileNotFoundError:
+                content = None
+
+                self.log_writer.log(
+                    log_file, f"Cache file {entry['file']} was evicted",
+                )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return content
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def put_entry(self, bucket, key, etag, content, log_file):
+        """
+        Method Name :   put_entry
+        Description :   This method stores the content of an object in the cache, replacing older versions of
+                        it, and evicts least recently used objects when the cache is over its size. An object
+                        larger than the whole cache is not cached, as it would evict every other object
+
+        Output      :   The content is stored in the cache directory
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.put_entry.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            if len(content) > self.max_size:
+                self.log_writer.log(
+                    log_file,
+                    f"{key} is larger than the cache, not caching it",
+                )
+
+                self.log_writer.start_log(
+                    "exit", self.class_name, method_name, log_file
+                )
+
+                return
+
+            cache_key = bucket + "/" + key
+
+            cache_file = self.get_cache_file(cache_key, etag)
+
+            meta_file = self.get_cache_file(cache_key)
+
+            self.write_file(cache_file, content)
+
+            with self.lock, open(self.lock_file, "w") as lock_f:
+                fcntl.flock(lock_f, fcntl.LOCK_EX)
+
+                try:
+                    with open(meta_file) as f:
+                        old_file = json.load(f)["file"]
+
+                except (OSError, ValueError):
+                    old_file = None
+
+                if old_file is not None and old_file != cache_file:
+                    self.remove_file(old_file)
+
+                self.write_file(
+                    meta_file,
+                    json.dumps(
+                        {"etag": etag, "file": cache_file, "size": len(content)}
+                    ).encode(),
+                )
+
+                self.evict(log_file)
+
+            self.log_writer.log(
+                log_file, f"Cached {key} from {bucket} bucket with etag {etag}",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def evict(self, log_file):
+        """
+        Method Name :   evict
+        Description :   This method removes the least recently used content files from the cache directory
+                        until it fits in the configured size. It is called with the cache file lock held
+
+        Output      :   Least recently used objects are removed from the cache
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.evict.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            cache_files = []
+
+            for f in os.scandir(self.cache_dir):
+                if "." not in f.name:
+                    stat = f.stat()
+
+                    cache_files.append((stat.st_mtime, stat.st_size, f.path))
+
+            total_size = sum(size for _, size, _ in cache_files)
+
+            for _, size, cache_file in sorted(cache_files):
+                if total_size <= self.max_size:
+                    break
+
+                self.remove_file(cache_file)
+
+                total_size -= size
+
+                self.log_writer.log(log_file, f"Evicted {cache_file} from cache")
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def remove_file(self, cache_file):
+        """
+        Method Name :   remove_file
+        Description :   This method removes a cache file from local disk, if it is still there
+
+        Output      :   The cache file is removed
+        On Failure  :   Missing files are ignored
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        try:
+            os.remove(cache_file)
+
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,106 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+from utils.read_params import read_params
+
+lock = threading.Lock()
+
+connection = {"pid": None, "session": None, "client": None}
+
+
+def get_client_config():
+    """
+    Method Name :   get_client_config
+    Description :   This method builds the botocore config for s3 from the s3_client section of params.yaml
+
+    Output      :   A botocore config with connection pool size, retry mode and timeouts is returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_client_config.__name__
+
+    try:
+        client_params = read_params()["s3_client"]
+
+        client_config = Config(
+            max_pool_connections=client_params["max_pool_connections"],
+            retries={
+                "mode": client_params["retry_mode"],
+                "max_attempts": client_params["max_attempts"],
+            },
+            connect_timeout=client_params["connect_timeout"],
+            read_timeout=client_params["read_timeout"],
+        )
+
+        return client_config
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
+
+
+def get_session():
+    """
+    Method Name :   get_session
+    Description :   This method gets the boto3 session shared by the process. A forked child process gets
+                    its own session, since connections cannot be shared across processes
+
+    Output      :   A boto3 session is returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_session.__name__
+
+    try:
+        with lock:
+            if connection["pid"] != os.getpid():
+                connection["session"] = boto3.session.Session()
+
+                connection["client"] = None
+
+                connection["pid"] = os.getpid()
+
+            return connection["session"]
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
+
+
+def get_s3_client():
+    """
+    Method Name :   get_s3_client
+    Description :   This method gets the s3 client shared by the process. boto3 clients are thread safe,
+                    so all threads reuse the same client and its connection pool
+
+    Output      :   A s3 client is returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_s3_client.__name__
+
+    try:
+        session = get_session()
+
+        with lock:
+            if connection["client"] is None:
+                connection["client"] = session.client(
+                    "s3", config=get_client_config()
+                )
+
+            return connection["client"]
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
@@ -1,14 +1,69 @@
+import csv
 import json
 import os
 import pickle
-from io import StringIO
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO, TextIOWrapper
 
-import boto3
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from botocore.exceptions import ClientError
 from utils.logger import App_Logger
-from utils.model_utils import Model_Utils
 from utils.read_params import read_params
+from utils.run_utils import get_run_time
+from wafer.s3_bucket_operations.s3_cache import S3_Cache
+from wafer.s3_bucket_operations.storage_backend import (
+    Multipart_Stream,
+    Storage_Object,
+    get_storage_backend,
+)
+
+lock = threading.Lock()
+
+shared = {"pid": None, "config": None, "storage": None, "s3_cache": None}
+
+
+def get_shared_state():
+    """
+    Method Name :   get_shared_state
+    Description :   This method gets the config, storage backend and local cache shared by all s3 operations
+                    of the process, so params.yaml is read once and creating a s3 operation costs nearly
+                    nothing. A forked child process builds its own, like the shared s3 client
+
+    Output      :   A dict of config, storage backend and local cache is returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_shared_state.__name__
+
+    try:
+        with lock:
+            if shared["pid"] != os.getpid():
+                config = read_params()
+
+                shared["config"] = config
+
+                shared["storage"] = get_storage_backend(config)
+
+                shared["s3_cache"] = (
+                    S3_Cache(config) if config["s3_cache"]["enabled"] else None
+                )
+
+                shared["pid"] = os.getpid()
+
+            return shared
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
 
 
 class S3_Operation:
@@ -21,22 +76,155 @@ class S3_Operation:
     """
 
     def __init__(self):
-        self.s3_client = boto3.client("s3")
+        state = get_shared_state()
 
-        self.s3_resource = boto3.resource("s3")
+        self.storage = state["storage"]
 
-        self.config = read_params()
+        self.config = state["config"]
 
-        self.log_writer = App_Logger()
+        self.read_workers = self.config["s3_operation"]["read_workers"]
+
+        self.list_page_size = self.config["s3_operation"]["list_page_size"]
+
+        self.in_memory_upload = self.config["s3_operation"]["in_memory_upload"]
+
+        self.copy_workers = self.config["s3_operation"]["copy_workers"]
+
+        self.delete_batch_size = self.config["s3_operation"]["delete_batch_size"]
+
+        self.s3_cache = state["s3_cache"]
+
+        self.intermediate_format = self.config["intermediate"]["format"]
 
-        self.model_utils = Model_Utils()
+        self.intermediate_compression = self.config["intermediate"]["compression"]
+
+        self.part_size = self.config["s3_operation"]["upload_chunk_size_mb"] * 1024 ** 2
+
+        self.streaming = self.config["streaming"]["enabled"]
+
+        self.stream_min_file_size = (
+            self.config["streaming"]["min_file_size_mb"] * 1024 ** 2
+        )
+
+        self.chunk_rows = self.config["streaming"]["chunk_rows"]
+
+        self.log_writer = App_Logger()
 
         self.class_name = self.__class__.__name__
 
-    def read_object(self, object, log_file, decode=True, make_readable=False):
+    def get_object_content(self, object, log_file, etag=None):
+        """
+        Method Name :   get_object_content
+        Description :   This method gets the content of the object, going through the local cache when it is
+                        enabled. A cached copy whose etag matches the given etag is used without any request,
+                        otherwise a conditional GET only transfers the object when it has changed. A cached
+                        copy which was evicted in the meantime is read from the bucket again
+
+        Output      :   The content of the object is returned as bytes
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_object_content.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            entry = None
+
+            if self.s3_cache is not None:
+                entry = self.s3_cache.get_entry(
+                    object.bucket_name, object.key, log_file
+                )
+
+            content = None
+
+            if entry is not None and etag is not None and entry["etag"] == etag:
+                content = self.s3_cache.read_entry(entry, log_file)
+
+                if content is not None:
+                    self.log_writer.log(
+                        log_file, f"Got {object.key} from cache with etag {etag}",
+                    )
+
+                entry = None
+
+            if content is None:
+                get_kwargs = {} if etag is None else {"IfMatch": etag}
+
+                if entry is not None and etag is None:
+                    get_kwargs["IfNoneMatch"] = entry["etag"]
+
+                try:
+                    response = object.get(**get_kwargs)
+
+                    content = self.read_body(response["Body"])
+
+                    self.log_writer.log(
+                        log_file,
+                        f"Got {object.key} from {object.bucket_name} bucket",
+                    )
+
+                    if self.s3_cache is not None:
+                        self.s3_cache.put_entry(
+                            object.bucket_name,
+                            object.key,
+                            response["ETag"],
+                            content,
+                            log_file,
+                        )
+
+                except ClientError as e:
+                    if entry is not None and e.response["Error"]["Code"] in (
+                        "304",
+                        "NotModified",
+                    ):
+                        content = self.s3_cache.read_entry(entry, log_file)
+
+                        if content is None:
+                            content = self.read_body(object.get()["Body"])
+
+                        self.log_writer.log(
+                            log_file,
+                            f"{object.key} is not modified, got it from cache",
+                        )
+
+                    else:
+                        raise e
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return content
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def read_body(self, body):
+        """
+        Method Name :   read_body
+        Description :   This method reads the whole body of an object and closes it, so the file handle of the
+                        local backend or the connection of the s3 backend is released at once
+
+        Output      :   The content of the body is returned as bytes
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        try:
+            return body.read()
+
+        finally:
+            body.close()
+
+    def read_object(
+        self, object, log_file, decode=True, make_readable=False, etag=None
+    ):
         """
         Method Name :   read_object
-        Description :   This method reads the object with kwargs
+        Description :   This method reads the object with kwargs. When etag is given, the GET is made
+                        conditional on it, so a changed object is not read silently
 
         Output      :   A object is read with kwargs
         On Failure  :   Write an exception log and then raise an exception
@@ -49,17 +237,17 @@ class S3_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            func = (
-                lambda: object.get()["Body"].read().decode()
-                if decode is True
-                else object.get()["Body"].read()
-            )
+            content = self.get_object_content(object, log_file, etag=etag)
+
+            if decode is True:
+                content = content.decode()
 
             self.log_writer.log(
                 log_file, f"Read the s3 object with decode as {decode}",
             )
 
-            conv_func = lambda: StringIO(func() if make_readable is True else func())
+            if make_readable is True:
+                content = StringIO(content) if decode is True else BytesIO(content)
 
             self.log_writer.log(
                 log_file, f"read the s3 object with make_readable as {make_readable}",
@@ -67,12 +255,12 @@ class S3_Operation:
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
-            return conv_func()
+            return content
 
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def read_text(self, fname, bucket, log_file):
+    def read_text(self, fname, bucket, log_file, etag=None):
         """
         Method Name :   read_text
         Description :   This method reads the text data from s3 bucket
@@ -88,9 +276,9 @@ class S3_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            txt_obj = self.get_file_object(fname, bucket, log_file)
+            txt_obj = self.get_key_object(fname, bucket, log_file)
 
-            content = self.read_object(txt_obj, log_file)
+            content = self.read_object(txt_obj, log_file, etag=etag)
 
             self.log_writer.log(
                 log_file, f"Read {fname} file as text from {bucket} bucket",
@@ -103,7 +291,7 @@ class S3_Operation:
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def read_json(self, fname, bucket, log_file):
+    def read_json(self, fname, bucket, log_file, etag=None):
         """
         Method Name :   read_json
         Description :   This method reads the json data from s3 bucket
@@ -119,9 +307,9 @@ class S3_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            f_obj = self.get_file_object(fname, bucket, log_file)
+            f_obj = self.get_key_object(fname, bucket, log_file)
 
-            json_content = self.read_object(f_obj, log_file)
+            json_content = self.read_object(f_obj, log_file, etag=etag)
 
             dic = json.loads(json_content)
 
@@ -136,10 +324,13 @@ class S3_Operation:
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def get_df_from_object(self, object, log_file):
+    def get_df_from_object(
+        self, object, log_file, etag=None, dtype=None, usecols=None
+    ):
         """
         Method Name :   get_df_from_object
-        Description :   This method gets dataframe from object 
+        Description :   This method gets dataframe from object. The bytes are parsed by the C parser, with
+                        the given dtypes and only the given columns when they are passed
 
         Output      :   Dataframe is read from the object
         On Failure  :   Write an exception log and then raise an exception
@@ -152,9 +343,13 @@ class S3_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            content = self.read_object(object, log_file, make_readable=True)
+            content = self.read_object(
+                object, log_file, decode=False, make_readable=True, etag=etag
+            )
 
-            df = pd.read_csv(content)
+            df = pd.read_csv(
+                content, dtype=dtype, usecols=usecols, engine="c", low_memory=True
+            )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
@@ -163,10 +358,13 @@ class S3_Operation:
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def read_csv(self, fname, bucket, log_file):
+    def read_csv(
+        self, fname, bucket, log_file, etag=None, dtype=None, usecols=None
+    ):
         """
         Method Name :   read_csv
-        Description :   This method reads the csv data from s3 bucket
+        Description :   This method reads the csv data from s3 bucket. When the file does not parse with
+                        the given dtypes, it is parsed again without them
 
         Output      :   A pandas series object consisting of runs for the particular experiment id
         On Failure  :   Write an exception log and then raise an exception
@@ -179,9 +377,25 @@ class S3_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            csv_obj = self.get_file_object(fname, bucket, log_file,)
+            csv_obj = self.get_key_object(fname, bucket, log_file)
 
-            df = self.get_df_from_object(csv_obj, log_file)
+            try:
+                df = self.get_df_from_object(
+                    csv_obj, log_file, etag=etag, dtype=dtype, usecols=usecols
+                )
+
+            except Exception as e:
+                if dtype is None:
+                    raise e
+
+                self.log_writer.log(
+                    log_file,
+                    f"Failed to parse {fname} with schema dtypes, parsing without them, Error : {e}",
+                )
+
+                df = self.get_df_from_object(
+                    csv_obj, log_file, etag=etag, usecols=usecols
+                )
 
             self.log_writer.log(
                 log_file, f"Read {fname} csv file from {bucket} bucket",
@@ -194,236 +408,305 @@ class S3_Operation:
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def read_csv_from_folder(self, folder_name, bucket, log_file):
+    def read_parquet(self, fname, bucket, log_file, etag=None, usecols=None):
         """
-        Method Name :   read_csv_from_folder
-        Description :   This method reads the csv files from folder
+        Method Name :   read_parquet
+        Description :   This method reads the parquet data from s3 bucket
 
-        Output      :   A list of tuple of dataframe, along with absolute file name and file name is returned
+        Output      :   A pandas dataframe of the parquet file is returned
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.read_csv_from_folder.__name__
+        method_name = self.read_parquet.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
         try:
-            files = self.get_files_from_folder(folder_name, bucket, log_file,)
+            parquet_obj = self.get_key_object(fname, bucket, log_file)
 
-            lst = [
-                (self.read_csv(f, bucket, log_file), f, f.split("/")[-1],)
-                for f in files
-            ]
+            content = self.read_object(
+                parquet_obj, log_file, decode=False, make_readable=True, etag=etag
+            )
+
+            df = pd.read_parquet(content, columns=usecols)
 
             self.log_writer.log(
-                log_file,
-                f"Read csv files from {folder_name} folder from {bucket} bucket",
+                log_file, f"Read {fname} parquet file from {bucket} bucket",
             )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
-            return lst
+            return df
 
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def load_object(self, object, bucket, log_file):
+    def read_frame(
+        self, fname, bucket, log_file, etag=None, dtype=None, usecols=None
+    ):
         """
-        Method Name :   load_object
-        Description :   This method loads the object from s3 bucket
+        Method Name :   read_frame
+        Description :   This method reads a csv or parquet file from s3 bucket, based on the file extension.
+                        Parquet files are already typed, so dtypes are only used for csv files
 
-        Output      :   An object is loaded from s3 bucket
+        Output      :   A pandas dataframe of the file is returned
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.load_object.__name__
+        method_name = self.read_frame.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            self.s3_resource.Object(bucket, object).load()
+            if fname.endswith(".parquet"):
+                df = self.read_parquet(
+                    fname, bucket, log_file, etag=etag, usecols=usecols
+                )
 
-            self.log_writer.log(
-                log_file, f"Loaded {object} from {bucket} bucket",
-            )
+            else:
+                df = self.read_csv(
+                    fname, bucket, log_file, etag=etag, dtype=dtype, usecols=usecols
+                )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
+            return df
+
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def create_folder(self, folder_name, bucket, log_file):
+    def read_csv_with_name(
+        self, fname, bucket, log_file, etag=None, dtype=None, usecols=None
+    ):
         """
-        Method Name :   create_folder
-        Description :   This method creates a folder in s3 bucket
+        Method Name :   read_csv_with_name
+        Description :   This method reads a single csv or parquet file of a folder, failures are logged and
+                        not raised
 
-        Output      :   A folder is created in s3 bucket 
-        On Failure  :   Write an exception log and then raise an exception
+        Output      :   A tuple of dataframe, absolute file name and file name, or None if the file could not be read
+        On Failure  :   Write a log with the failed file name and return None
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.create_folder.__name__
+        method_name = self.read_csv_with_name.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            self.load_object(bucket, folder_name)
-
-            self.log_writer.log(
-                log_file, f"Folder {folder_name} already exists.",
+            df = self.read_frame(
+                fname, bucket, log_file, etag=etag, dtype=dtype, usecols=usecols
             )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "404":
-                self.log_writer.log(
-                    log_file, f"{folder_name} folder does not exist,creating new one",
-                )
-
-                self.put_object(folder_name, bucket, log_file)
-
-                self.log_writer.log(
-                    log_file, f"{folder_name} folder created in {bucket} bucket",
-                )
-
-            else:
-                self.log_writer.log(
-                    log_file, f"Error occured in creating {folder_name} folder",
-                )
-
-                self.log_writer.exception_log(e, self.class_name, method_name, log_file)
-
-    def put_object(self, object, bucket, log_file):
-        """
-        Method Name :   put_object
-        Description :   This method puts an object in s3 bucket
-
-        Output      :   An object is put in s3 bucket
-        On Failure  :   Write an exception log and then raise an exception
-
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
-        """
-        method_name = self.put_object.__name__
-
-        self.log_writer.start_log("start", self.class_name, method_name, log_file)
-
-        try:
-            self.s3_client.put_object(bucket, (object + "/"))
+            return df, fname, fname.split("/")[-1]
 
+        except Exception as e:
             self.log_writer.log(
-                log_file, f"Created {object} folder in {bucket} bucket",
+                log_file, f"Failed to read {fname} from {bucket} bucket, Error : {e}",
             )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
-        except Exception as e:
-            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
-
-    def upload_file(self, from_fname, to_fname, bucket, log_file, remove=True):
+            return None
+
+    def read_csv_from_folder(
+        self,
+        folder_name,
+        bucket,
+        log_file,
+        max_workers=None,
+        dtype=None,
+        usecols=None,
+        skip_large_files=False,
+    ):
         """
-        Method Name :   upload_file
-        Description :   This method uploades a file to s3 bucket with kwargs
+        Method Name :   read_csv_from_folder
+        Description :   This method reads the csv files from folder. When more than one worker is configured,
+                        the files are downloaded and parsed concurrently, starting while the folder is still
+                        being listed. Files which could not be read are logged and left out of the result.
+                        The dtypes and columns are passed on to the parser of every file. With skip_large_files,
+                        the files which are streamed in chunks are left out
 
-        Output      :   A file is uploaded to s3 bucket
+        Output      :   A list of tuple of dataframe, along with absolute file name and file name is returned
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.upload_file.__name__
+        method_name = self.read_csv_from_folder.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            self.log_writer.log(
-                log_file, f"Uploading {from_fname} to s3 bucket {bucket}",
+            files = (
+                f
+                for f in self.iter_files_from_folder(folder_name, bucket, log_file)
+                if not f["key"].endswith("/")
+                and not (skip_large_files is True and self.is_large_file(f))
             )
 
-            self.s3_resource.meta.client.upload_file(from_fname, bucket, to_fname)
-
-            self.log_writer.log(
-                log_file, f"Uploaded {from_fname} to s3 bucket {bucket}",
-            )
+            workers = self.read_workers if max_workers is None else max_workers
 
-            if remove is True:
+            if workers > 1:
                 self.log_writer.log(
-                    log_file, f"Option remove is set {remove}..deleting the file",
+                    log_file, f"Reading files with {workers} workers",
                 )
 
-                os.remove(from_fname)
-
-                self.log_writer.log(
-                    log_file, f"Removed the local copy of {from_fname}",
-                )
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(
+                            self.read_csv_with_name,
+                            f["key"],
+                            bucket,
+                            log_file,
+                            etag=f["etag"],
+                            dtype=dtype,
+                            usecols=usecols,
+                        )
+                        for f in files
+                    ]
+
+                    results = [future.result() for future in futures]
 
             else:
-                self.log_writer.log(
-                    log_file, f"Option remove is set {remove}, not deleting the file",
-                )
+                results = [
+                    self.read_csv_with_name(
+                        f["key"],
+                        bucket,
+                        log_file,
+                        etag=f["etag"],
+                        dtype=dtype,
+                        usecols=usecols,
+                    )
+                    for f in files
+                ]
+
+            lst = [res for res in results if res is not None]
+
+            self.log_writer.log(
+                log_file,
+                f"Read {len(lst)} csv files from {folder_name} folder from {bucket} bucket, {len(results) - len(lst)} files failed",
+            )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
+            return lst
+
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def get_bucket(self, bucket, log_file):
+    def is_large_file(self, f):
+        """
+        Method Name :   is_large_file
+        Description :   This method checks if a listed file is large enough to be streamed in chunks, as set
+                        in the streaming section of params.yaml
+
+        Output      :   True if the file is streamed in chunks, else False
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        return self.streaming is True and f["size"] >= self.stream_min_file_size
+
+    def get_large_files_from_folder(self, folder_name, bucket, log_file):
         """
-        Method Name :   get_bucket
-        Description :   This method gets the bucket from s3 
+        Method Name :   get_large_files_from_folder
+        Description :   This method gets the files of a folder which are streamed in chunks, instead of being
+                        read in memory
 
-        Output      :   A s3 bucket name is returned based on the bucket
+        Output      :   A list of dicts with key, size, etag and last modified time of each large file
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.get_bucket.__name__
+        method_name = self.get_large_files_from_folder.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            bucket = self.s3_resource.Bucket(bucket)
+            files = []
+
+            if self.streaming is True:
+                files = [
+                    f
+                    for f in self.iter_files_from_folder(folder_name, bucket, log_file)
+                    if not f["key"].endswith("/") and self.is_large_file(f)
+                ]
 
             self.log_writer.log(
-                log_file, f"Got {bucket} bucket",
+                log_file,
+                f"Got {len(files)} files to stream in chunks from {folder_name} folder of {bucket} bucket",
             )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
-            return bucket
+            return files
 
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def copy_data(self, from_fname, from_bucket, to_fname, to_bucket, log_file):
+    def iter_csv_chunks(
+        self,
+        fname,
+        bucket,
+        log_file,
+        chunk_rows=None,
+        etag=None,
+        dtype=None,
+        usecols=None,
+    ):
         """
-        Method Name :   copy_data
-        Description :   This method copies the data from one bucket to another bucket
+        Method Name :   iter_csv_chunks
+        Description :   This method reads a csv file from s3 bucket in chunks of rows. The body of the object
+                        is parsed while it is downloaded, so only one chunk is held in memory and the local
+                        cache is not used
 
-        Output      :   The data is copied from one bucket to another
+        Output      :   A generator of dataframes, one for each chunk of the file
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.copy_data.__name__
+        method_name = self.iter_csv_chunks.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            copy_source = {"Bucket": from_bucket, "Key": from_fname}
+            get_kwargs = {} if etag is None else {"IfMatch": etag}
+
+            body = self.storage.get_object(bucket, fname, **get_kwargs)["Body"]
+
+            try:
+                reader = pd.read_csv(
+                    body,
+                    chunksize=self.chunk_rows if chunk_rows is None else chunk_rows,
+                    dtype=dtype,
+                    usecols=usecols,
+                    engine="c",
+                    low_memory=True,
+                )
+
+                chunks = 0
+
+                for df in reader:
+                    chunks += 1
 
-            self.s3_resource.meta.client.copy(copy_source, to_bucket, to_fname)
+                    yield df
+
+            finally:
+                body.close()
 
             self.log_writer.log(
                 log_file,
-                f"Copied data from bucket {from_bucket} to bucket {to_bucket}",
+                f"Read {fname} csv file from {bucket} bucket in {chunks} chunks",
             )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
@@ -431,26 +714,46 @@ class S3_Operation:
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def delete_file(self, fname, bucket, log_file):
+    def iter_parquet_chunks(self, fname, bucket, log_file, chunk_rows=None, etag=None):
         """
-        Method Name :   delete_file
-        Description :   This method delete the file from s3 bucket
+        Method Name :   iter_parquet_chunks
+        Description :   This method reads a parquet file from s3 bucket in batches of rows. Parquet needs
+                        random access to its footer, so the object is first copied in blocks to a temporary
+                        file on local disk, and the batches are read from there
 
-        Output      :   The file is deleted from s3 bucket
+        Output      :   A generator of dataframes, one for each batch of the file
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.delete_file.__name__
+        method_name = self.iter_parquet_chunks.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            self.s3_resource.Object(bucket, fname).delete()
+            get_kwargs = {} if etag is None else {"IfMatch": etag}
+
+            body = self.storage.get_object(bucket, fname, **get_kwargs)["Body"]
+
+            with tempfile.TemporaryFile() as tmp_f:
+                try:
+                    shutil.copyfileobj(body, tmp_f)
+
+                finally:
+                    body.close()
+
+                tmp_f.seek(0)
+
+                parquet_file = pq.ParquetFile(tmp_f)
+
+                for batch in parquet_file.iter_batches(
+                    batch_size=self.chunk_rows if chunk_rows is None else chunk_rows
+                ):
+                    yield batch.to_pandas()
 
             self.log_writer.log(
-                log_file, f"Deleted {fname} from bucket {bucket}",
+                log_file, f"Read {fname} parquet file from {bucket} bucket in chunks",
             )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
@@ -458,68 +761,881 @@ class S3_Operation:
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def move_data(self, from_fname, from_bucket, to_fname, to_bucket, log_file):
+    def iter_frame_chunks(
+        self, fname, bucket, log_file, chunk_rows=None, etag=None, dtype=None
+    ):
         """
-        Method Name :   move_data
-        Description :   This method moves the data from one bucket to other bucket
+        Method Name :   iter_frame_chunks
+        Description :   This method reads a csv or parquet file from s3 bucket in chunks of rows, based on
+                        the file extension. Parquet files are already typed, so dtypes are only used for csv
+                        files
 
-        Output      :   The data is moved from one bucket to another
+        Output      :   A generator of dataframes, one for each chunk of the file
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        if fname.endswith(".parquet"):
+            return self.iter_parquet_chunks(
+                fname, bucket, log_file, chunk_rows=chunk_rows, etag=etag
+            )
+
+        return self.iter_csv_chunks(
+            fname, bucket, log_file, chunk_rows=chunk_rows, etag=etag, dtype=dtype
+        )
+
+    def read_csv_header(
+        self, fname, bucket, log_file, probe_bytes=16384, etag=None
+    ):
+        """
+        Method Name :   read_csv_header
+        Description :   This method reads only the header of a csv file, using range reads of the first bytes
+                        of the object. The range is doubled until the first line is complete
+
+        Output      :   A list of column names of the csv file is returned
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.move_data.__name__
+        method_name = self.read_csv_header.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            self.copy_data(from_fname, from_bucket, to_fname, to_bucket, log_file)
+            get_kwargs = {} if etag is None else {"IfMatch": etag}
 
-            self.delete_file(
-                from_bucket, from_fname, log_file,
-            )
+            while True:
+                get_kwargs["Range"] = f"bytes=0-{probe_bytes - 1}"
+
+                content = self.read_body(
+                    self.storage.get_object(bucket, fname, **get_kwargs)["Body"]
+                )
+
+                if b"\n" in content or len(content) < probe_bytes:
+                    break
+
+                probe_bytes *= 2
+
+            header = content.split(b"\n", 1)[0].decode().rstrip("\r")
+
+            columns = next(csv.reader([header]))
 
             self.log_writer.log(
                 log_file,
-                f"Moved {from_fname} from bucket {from_bucket} to {to_bucket}",
+                f"Read header of {fname} with {len(columns)} columns from the first {len(content)} bytes",
             )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
+            return columns
+
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def get_files_from_folder(self, folder_name, bucket, log_file):
+    def read_csv_headers_from_folder(
+        self, folder_name, bucket, log_file, probe_bytes=16384, max_workers=None
+    ):
         """
-        Method Name :   get_files_from_folder
-        Description :   This method gets the files a folder in s3 bucket
+        Method Name :   read_csv_headers_from_folder
+        Description :   This method reads only the headers of the csv files of a folder, concurrently when
+                        more than one worker is configured. Files whose header could not be read are logged
+                        and left out of the result
 
-        Output      :   A list of files is returned
+        Output      :   A list of tuple of column names, along with absolute file name and file name is returned
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.get_files_from_folder.__name__
+        method_name = self.read_csv_headers_from_folder.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            lst = self.get_file_object(folder_name, bucket, log_file)
 
-            list_of_files = [object.key for object in lst]
+            def read_header(f):
+                try:
+                    columns = self.read_csv_header(
+                        f["key"], bucket, log_file, probe_bytes, etag=f["etag"]
+                    )
 
-            self.log_writer.log(
-                log_file, f"Got list of files from bucket {bucket}",
-            )
+                    return columns, f["key"], f["key"].split("/")[-1]
 
-            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+                except Exception as e:
+                    self.log_writer.log(
+                        log_file, f"Failed to read header of {f['key']}, Error : {e}",
+                    )
 
-            return list_of_files
+                    return None
 
-        except Exception as e:
-            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+            files = (
+                f
+                for f in self.iter_files_from_folder(folder_name, bucket, log_file)
+                if not f["key"].endswith("/")
+            )
+
+            workers = self.read_workers if max_workers is None else max_workers
+
+            with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+                futures = [executor.submit(read_header, f) for f in files]
+
+                results = [future.result() for future in futures]
+
+            lst = [res for res in results if res is not None]
+
+            self.log_writer.log(
+                log_file,
+                f"Read headers of {len(lst)} files from {folder_name} folder from {bucket} bucket, {len(results) - len(lst)} files failed",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return lst
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def load_object(self, object, bucket, log_file):
+        """
+        Method Name :   load_object
+        Description :   This method loads the object from s3 bucket
+
+        Output      :   The head of the object in s3 bucket is returned, with its etag
+        On Failure  :   Write a log and raise the client error as it is, so callers can check for 404,
+                        else write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.load_object.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            response = self.storage.head_object(bucket, object)
+
+            self.log_writer.log(
+                log_file, f"Loaded {object} from {bucket} bucket",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return response
+
+        except ClientError as e:
+            self.log_writer.log(
+                log_file, f"Could not load {object} from {bucket} bucket, Error : {e}",
+            )
+
+            raise e
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def create_folder(self, folder_name, bucket, log_file):
+        """
+        Method Name :   create_folder
+        Description :   This method creates a folder in s3 bucket
+
+        Output      :   A folder is created in s3 bucket 
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.create_folder.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            self.load_object(folder_name + "/", bucket, log_file)
+
+            self.log_writer.log(
+                log_file, f"Folder {folder_name} already exists.",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "404":
+                self.log_writer.log(
+                    log_file, f"{folder_name} folder does not exist,creating new one",
+                )
+
+                self.put_object(folder_name, bucket, log_file)
+
+                self.log_writer.log(
+                    log_file, f"{folder_name} folder created in {bucket} bucket",
+                )
+
+            else:
+                self.log_writer.log(
+                    log_file, f"Error occured in creating {folder_name} folder",
+                )
+
+                self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def put_object(self, object, bucket, log_file):
+        """
+        Method Name :   put_object
+        Description :   This method puts an object in s3 bucket
+
+        Output      :   An object is put in s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.put_object.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            self.storage.put_object(bucket, object + "/", BytesIO())
+
+            self.log_writer.log(
+                log_file, f"Created {object} folder in {bucket} bucket",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def upload_buffer(self, buffer, to_fname, bucket, log_file):
+        """
+        Method Name :   upload_buffer
+        Description :   This method uploads a file like object to s3 bucket, without writing it to local disk.
+                        Large buffers are sent as a multipart upload with the configured chunk size
+
+        Output      :   A file like object is uploaded to s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.upload_buffer.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            buffer.seek(0)
+
+            self.storage.put_object(bucket, to_fname, buffer)
+
+            self.log_writer.log(
+                log_file, f"Uploaded buffer as {to_fname} to s3 bucket {bucket}",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def upload_buffer_if_match(self, buffer, to_fname, bucket, log_file, etag=None):
+        """
+        Method Name :   upload_buffer_if_match
+        Description :   This method uploads a file like object to s3 bucket only if the object still has the
+                        given etag, or does not exist yet when no etag is given, so a concurrent writer is
+                        never overwritten
+
+        Output      :   The etag of the uploaded object is returned, or None if the object was changed
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.upload_buffer_if_match.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            buffer.seek(0)
+
+            try:
+                new_etag = self.storage.put_object_if_match(
+                    bucket, to_fname, buffer, etag=etag
+                )
+
+                self.log_writer.log(
+                    log_file, f"Uploaded buffer as {to_fname} to s3 bucket {bucket}",
+                )
+
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in (
+                    "412",
+                    "PreconditionFailed",
+                    "ConditionalRequestConflict",
+                ):
+                    raise e
+
+                new_etag = None
+
+                self.log_writer.log(
+                    log_file,
+                    f"{to_fname} in {bucket} bucket was changed, not uploading buffer",
+                )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return new_etag
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def upload_file(self, from_fname, to_fname, bucket, log_file, remove=True):
+        """
+        Method Name :   upload_file
+        Description :   This method uploades a file to s3 bucket with kwargs. from_fname can also be a
+                        file like object, which is then uploaded from memory
+
+        Output      :   A file is uploaded to s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.upload_file.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            if hasattr(from_fname, "read"):
+                self.upload_buffer(from_fname, to_fname, bucket, log_file)
+
+                self.log_writer.start_log(
+                    "exit", self.class_name, method_name, log_file
+                )
+
+                return
+
+            self.log_writer.log(
+                log_file, f"Uploading {from_fname} to s3 bucket {bucket}",
+            )
+
+            self.storage.upload_file(bucket, to_fname, from_fname)
+
+            self.log_writer.log(
+                log_file, f"Uploaded {from_fname} to s3 bucket {bucket}",
+            )
+
+            if remove is True:
+                self.log_writer.log(
+                    log_file, f"Option remove is set {remove}..deleting the file",
+                )
+
+                os.remove(from_fname)
+
+                self.log_writer.log(
+                    log_file, f"Removed the local copy of {from_fname}",
+                )
+
+            else:
+                self.log_writer.log(
+                    log_file, f"Option remove is set {remove}, not deleting the file",
+                )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def copy_data(self, from_fname, from_bucket, to_fname, to_bucket, log_file):
+        """
+        Method Name :   copy_data
+        Description :   This method copies the data from one bucket to another bucket
+
+        Output      :   The data is copied from one bucket to another
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.copy_data.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            self.storage.copy_object(from_bucket, from_fname, to_bucket, to_fname)
+
+            self.log_writer.log(
+                log_file,
+                f"Copied data from bucket {from_bucket} to bucket {to_bucket}",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def delete_file(self, fname, bucket, log_file):
+        """
+        Method Name :   delete_file
+        Description :   This method delete the file from s3 bucket
+
+        Output      :   The file is deleted from s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.delete_file.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            self.storage.delete_object(bucket, fname)
+
+            self.log_writer.log(
+                log_file, f"Deleted {fname} from bucket {bucket}",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def move_data(self, from_fname, from_bucket, to_fname, to_bucket, log_file):
+        """
+        Method Name :   move_data
+        Description :   This method moves the data from one bucket to other bucket
+
+        Output      :   The data is moved from one bucket to another
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.move_data.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            self.copy_data(from_fname, from_bucket, to_fname, to_bucket, log_file)
+
+            self.delete_file(
+                from_fname, from_bucket, log_file,
+            )
+
+            self.log_writer.log(
+                log_file,
+                f"Moved {from_fname} from bucket {from_bucket} to {to_bucket}",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def copy_data_bulk(
+        self, file_pairs, from_bucket, to_bucket, log_file, max_workers=None
+    ):
+        """
+        Method Name :   copy_data_bulk
+        Description :   This method copies a list of (from_fname, to_fname) pairs from one bucket to another
+                        bucket, running the server side copies concurrently
+
+        Output      :   A dict of from_fname to "success" or the error message of the failed copy
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.copy_data_bulk.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+
+            def copy_pair(file_pair):
+                from_fname, to_fname = file_pair
+
+                try:
+                    self.storage.copy_object(
+                        from_bucket, from_fname, to_bucket, to_fname
+                    )
+
+                    return from_fname, "success"
+
+                except Exception as e:
+                    return from_fname, str(e)
+
+            workers = self.copy_workers if max_workers is None else max_workers
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = dict(executor.map(copy_pair, file_pairs))
+
+            failed = [f for f, res in results.items() if res != "success"]
+
+            self.log_writer.log(
+                log_file,
+                f"Copied {len(results) - len(failed)} files from bucket {from_bucket} to bucket {to_bucket}, {len(failed)} copies failed",
+            )
+
+            for f in failed:
+                self.log_writer.log(
+                    log_file, f"Failed to copy {f}, Error : {results[f]}",
+                )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return results
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def delete_files_bulk(self, fnames, bucket, log_file):
+        """
+        Method Name :   delete_files_bulk
+        Description :   This method deletes a list of files from s3 bucket, with one delete_objects request
+                        per batch of files
+
+        Output      :   A dict of fname to "success" or the error message of the failed delete
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.delete_files_bulk.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            fnames = list(fnames)
+
+            results = {}
+
+            for idx in range(0, len(fnames), self.delete_batch_size):
+                batch = fnames[idx : idx + self.delete_batch_size]
+
+                errors = self.storage.delete_objects(bucket, batch)
+
+                results.update({f: "success" for f in batch})
+
+                for error in errors:
+                    results[error["Key"]] = error["Message"]
+
+            failed = [f for f, res in results.items() if res != "success"]
+
+            self.log_writer.log(
+                log_file,
+                f"Deleted {len(results) - len(failed)} files from bucket {bucket}, {len(failed)} deletes failed",
+            )
+
+            for f in failed:
+                self.log_writer.log(
+                    log_file, f"Failed to delete {f}, Error : {results[f]}",
+                )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return results
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def move_data_bulk(
+        self, file_pairs, from_bucket, to_bucket, log_file, max_workers=None
+    ):
+        """
+        Method Name :   move_data_bulk
+        Description :   This method moves a list of (from_fname, to_fname) pairs from one bucket to another
+                        bucket. The copies run concurrently and only the copied files are deleted, in batches
+
+        Output      :   A dict of from_fname to "success" or the error message of the failed move
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.move_data_bulk.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            results = self.copy_data_bulk(
+                file_pairs, from_bucket, to_bucket, log_file, max_workers=max_workers
+            )
+
+            copied = [f for f, res in results.items() if res == "success"]
+
+            results.update(self.delete_files_bulk(copied, from_bucket, log_file))
+
+            self.log_writer.log(
+                log_file,
+                f"Moved {len(copied)} files from bucket {from_bucket} to {to_bucket}",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return results
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_files_from_folder(self, folder_name, bucket, log_file):
+        """
+        Method Name :   get_files_from_folder
+        Description :   This method gets the files a folder in s3 bucket
+
+        Output      :   A list of files is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_files_from_folder.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            list_of_files = [
+                f["key"]
+                for f in self.iter_files_from_folder(folder_name, bucket, log_file)
+            ]
+
+            self.log_writer.log(
+                log_file, f"Got list of files from bucket {bucket}",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return list_of_files
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def iter_files_from_folder(
+        self, folder_name, bucket, log_file, delimiter=None, page_size=None
+    ):
+        """
+        Method Name :   iter_files_from_folder
+        Description :   This method lists the files of a folder in s3 bucket page by page, yielding each file
+                        as soon as its page arrives. With a delimiter only the files directly under the folder
+                        are listed, nested folders are not scanned
+
+        Output      :   A generator of dicts with key, size, etag and last modified time of each file
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.iter_files_from_folder.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            prefix = folder_name
+
+            if delimiter is not None and not folder_name.endswith(delimiter):
+                prefix = folder_name + delimiter
+
+            pages = self.storage.list_objects(
+                bucket,
+                prefix,
+                delimiter=delimiter,
+                page_size=self.list_page_size if page_size is None else page_size,
+            )
+
+            for page_num, page in enumerate(pages):
+                contents = page.get("Contents", [])
+
+                self.log_writer.log(
+                    log_file,
+                    f"Got page {page_num} with {len(contents)} files from {folder_name} folder of {bucket} bucket",
+                )
+
+                for content in contents:
+                    yield {
+                        "key": content["Key"],
+                        "size": content["Size"],
+                        "etag": content["ETag"],
+                        "last_modified": content["LastModified"],
+                    }
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_sub_folders(self, folder_name, bucket, log_file, delimiter="/"):
+        """
+        Method Name :   get_sub_folders
+        Description :   This method gets the folders directly under a folder in s3 bucket, using a delimiter
+                        listing so that the files inside them are not scanned
+
+        Output      :   A list of sub folder prefixes is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_sub_folders.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            prefix = (
+                folder_name
+                if folder_name.endswith(delimiter)
+                else folder_name + delimiter
+            )
+
+            sub_folders = [
+                common_prefix["Prefix"]
+                for page in self.storage.list_objects(
+                    bucket, prefix, delimiter=delimiter, page_size=self.list_page_size
+                )
+                for common_prefix in page.get("CommonPrefixes", [])
+            ]
+
+            self.log_writer.log(
+                log_file,
+                f"Got {len(sub_folders)} sub folders of {folder_name} folder from bucket {bucket}",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return sub_folders
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def clean_run_folders(self, folder_name, bucket, log_file, keep_run_id=None):
+        """
+        Method Name :   clean_run_folders
+        Description :   This method removes the run folders of a folder which are past the retention in the
+                        run_folders section of params.yaml. Only the newest max_runs runs which are not older
+                        than max_age_days are kept, the files of the other runs are deleted in batches, or moved
+                        to the archive folder when archive is set
+
+        Output      :   Old run folders are deleted or archived
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.clean_run_folders.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            max_runs = self.config["run_folders"]["max_runs"]
+
+            max_age = timedelta(days=self.config["run_folders"]["max_age_days"])
+
+            runs = []
+
+            for sub_folder in self.get_sub_folders(folder_name, bucket, log_file):
+                run_id = sub_folder.rstrip("/").split("/")[-1]
+
+                run_time = get_run_time(run_id)
+
+                if run_time is not None and run_id != keep_run_id:
+                    runs.append((run_time, sub_folder))
+
+            runs.sort(reverse=True)
+
+            keep_runs = max_runs - 1 if keep_run_id is not None else max_runs
+
+            old_runs = [
+                sub_folder
+                for idx, (run_time, sub_folder) in enumerate(runs)
+                if idx >= keep_runs or datetime.now() - run_time > max_age
+            ]
+
+            old_files = [
+                f
+                for sub_folder in old_runs
+                for f in self.get_files_from_folder(sub_folder, bucket, log_file)
+            ]
+
+            if self.config["run_folders"]["archive"] is True:
+                archive_dir = self.config["run_folders"]["archive_dir"]
+
+                archive_pairs = [
+                    (f, archive_dir + "/" + f) for f in old_files if not f.endswith("/")
+                ]
+
+                self.move_data_bulk(archive_pairs, bucket, bucket, log_file)
+
+                self.delete_files_bulk(
+                    [f for f in old_files if f.endswith("/")], bucket, log_file
+                )
+
+            else:
+                self.delete_files_bulk(old_files, bucket, log_file)
+
+            self.log_writer.log(
+                log_file,
+                f"Cleaned {len(old_runs)} old run folders with {len(old_files)} files from {folder_name} folder, kept {len(runs) - len(old_runs)} runs",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_objects_from_folder(self, folder_name, bucket, log_file):
+        """
+        Method Name :   get_objects_from_folder
+        Description :   This method gets the files of a folder in s3 bucket along with their metadata
+
+        Output      :   A list of dicts with key, size, etag and last modified time of each file is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_objects_from_folder.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            list_of_objects = list(
+                self.iter_files_from_folder(folder_name, bucket, log_file)
+            )
+
+            self.log_writer.log(
+                log_file, f"Got list of files with metadata from bucket {bucket}",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return list_of_objects
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_key_object(self, fname, bucket, log_file):
+        """
+        Method Name :   get_key_object
+        Description :   This method gets the object for the exact key from s3 bucket, without listing the bucket.
+                        No request is made until the object is read
+
+        Output      :   A s3 object is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_key_object.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            key_obj = Storage_Object(self.storage, bucket, fname)
+
+            self.log_writer.log(log_file, f"Got {fname} object from bucket {bucket}")
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return key_obj
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
     def get_file_object(self, fname, bucket, log_file):
         """
@@ -537,9 +1653,10 @@ class S3_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            bucket = self.get_bucket(bucket, log_file)
-
-            lst_objs = [object for object in bucket.objects.filter(Prefix=fname)]
+            lst_objs = [
+                Storage_Object(self.storage, bucket, f["key"])
+                for f in self.iter_files_from_folder(fname, bucket, log_file)
+            ]
 
             self.log_writer.log(log_file, f"Got {fname} from bucket {bucket}")
 
@@ -554,7 +1671,9 @@ class S3_Operation:
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def load_model(self, model_name, bucket, log_file, format, model_dir=None):
+    def load_model(
+        self, model_name, bucket, log_file, format, model_dir=None, etag=None
+    ):
         """
         Method Name :   load_model
         Description :   This method loads the model from s3 bucket
@@ -579,12 +1698,12 @@ class S3_Operation:
             model_file = func()
 
             self.log_writer.log(
-                log_file == log_file, f"Got {model_file} as model file",
+                log_file, f"Got {model_file} as model file",
             )
 
-            f_obj = self.get_file_object(model_name, bucket, log_file)
+            f_obj = self.get_key_object(model_file, bucket, log_file)
 
-            model_obj = self.read_object(f_obj, log_file, decode=False)
+            model_obj = self.read_object(f_obj, log_file, decode=False, etag=etag)
 
             model = pickle.loads(model_obj)
 
@@ -599,10 +1718,13 @@ class S3_Operation:
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def save_model(self, model, model_dir, model_bucket, log_file, format, idx=None):
+    def save_model(
+        self, model, model_dir, model_bucket, log_file, format, idx=None, in_memory=None
+    ):
         """
         Method Name :   save_model
-        Description :   This method saves the model into particular model directory in s3 bucket with kwargs
+        Description :   This method saves the model into particular model directory in s3 bucket with kwargs.
+                        With in_memory the model is pickled into a buffer instead of a local file
 
         Output      :   A pandas series object consisting of runs for the particular experiment id
         On Failure  :   Write an exception log and then raise an exception
@@ -625,20 +1747,36 @@ class S3_Operation:
 
             model_file = func()
 
-            with open(file=model_file, mode="wb") as f:
-                pickle.dump(model, f)
+            bucket_model_path = model_dir + "/" + model_file
 
-            self.log_writer.log(
-                log_file, f"Saved {model_name} model as {model_file} name",
-            )
+            if in_memory is None:
+                in_memory = self.in_memory_upload
 
-            bucket_model_path = model_dir + "/" + model_file
+            if in_memory is True:
+                model_buffer = BytesIO(pickle.dumps(model))
 
-            self.log_writer.log(
-                log_file, f"Uploading {model_file} to {model_bucket} bucket",
-            )
+                self.log_writer.log(
+                    log_file,
+                    f"Saved {model_name} model to buffer as {model_file} name",
+                )
+
+                self.upload_buffer(
+                    model_buffer, bucket_model_path, model_bucket, log_file
+                )
+
+            else:
+                with open(file=model_file, mode="wb") as f:
+                    pickle.dump(model, f)
 
-            self.upload_file(model_file, bucket_model_path, model_bucket, log_file)
+                self.log_writer.log(
+                    log_file, f"Saved {model_name} model as {model_file} name",
+                )
+
+                self.log_writer.log(
+                    log_file, f"Uploading {model_file} to {model_bucket} bucket",
+                )
+
+                self.upload_file(model_file, bucket_model_path, model_bucket, log_file)
 
             self.log_writer.log(
                 log_file, f"Uploaded  {model_file} to {model_bucket} bucket",
@@ -653,10 +1791,50 @@ class S3_Operation:
 
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def upload_df_as_csv(self, data_frame, local_fname, bucket_fname, bucket, log_file):
+    def get_csv_buffer(self, data_frame, log_file):
+        """
+        Method Name :   get_csv_buffer
+        Description :   This method serializes a dataframe as csv straight into an in-memory bytes buffer
+
+        Output      :   A bytes buffer containing the csv file is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_csv_buffer.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            csv_buffer = BytesIO()
+
+            text_buffer = TextIOWrapper(
+                csv_buffer, encoding="utf-8", write_through=True
+            )
+
+            data_frame.to_csv(text_buffer, index=None, header=True)
+
+            text_buffer.detach()
+
+            self.log_writer.log(
+                log_file, f"Serialized dataframe as csv of {csv_buffer.tell()} bytes",
+            )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return csv_buffer
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def upload_df_as_csv(
+        self, data_frame, local_fname, bucket_fname, bucket, log_file, in_memory=None
+    ):
         """
         Method Name :   upload_df_as_csv
-        Description :   This method uploades a dataframe as csv file to s3 bucket
+        Description :   This method uploades a dataframe as csv file to s3 bucket. With in_memory the csv
+                        is serialized into a buffer and no local file is written
 
         Output      :   A dataframe is uploaded as csv file to s3 bucket
         On Failure  :   Write an exception log and then raise an exception
@@ -669,15 +1847,215 @@ class S3_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            data_frame.to_csv(local_fname, index=None, header=True)
+            if in_memory is None:
+                in_memory = self.in_memory_upload
+
+            if in_memory is True:
+                csv_buffer = self.get_csv_buffer(data_frame, log_file)
+
+                self.upload_buffer(csv_buffer, bucket_fname, bucket, log_file)
+
+            else:
+                data_frame.to_csv(local_fname, index=None, header=True)
+
+                self.log_writer.log(
+                    log_file,
+                    f"Created a local copy of dataframe with name {local_fname}",
+                )
+
+                self.upload_file(local_fname, bucket_fname, bucket, log_file)
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def get_frame_fname(self, fname):
+        """
+        Method Name :   get_frame_fname
+        Description :   This method gets the file name of an intermediate file, with the extension of the
+                        intermediate format in params.yaml
+
+        Output      :   The file name with csv or parquet extension is returned
+        On Failure  :   Raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        return os.path.splitext(fname)[0] + "." + self.intermediate_format
+
+    def upload_df_as_parquet(self, data_frame, bucket_fname, bucket, log_file):
+        """
+        Method Name :   upload_df_as_parquet
+        Description :   This method uploads a dataframe as parquet file to s3 bucket, compressed with the
+                        intermediate compression in params.yaml
+
+        Output      :   A dataframe is uploaded as parquet file to s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.upload_df_as_parquet.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            parquet_buffer = BytesIO()
+
+            data_frame.to_parquet(
+                parquet_buffer, compression=self.intermediate_compression, index=False
+            )
 
             self.log_writer.log(
-                log_file, f"Created a local copy of dataframe with name {local_fname}",
+                log_file,
+                f"Serialized dataframe as parquet of {parquet_buffer.tell()} bytes",
             )
 
-            self.upload_file(local_fname, bucket_fname, bucket, log_file)
+            self.upload_buffer(parquet_buffer, bucket_fname, bucket, log_file)
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def upload_frame(self, data_frame, fname, bucket, log_file):
+        """
+        Method Name :   upload_frame
+        Description :   This method uploads a dataframe which is read back by the pipeline, in the
+                        intermediate format in params.yaml
+
+        Output      :   A dataframe is uploaded to s3 bucket and the file name it was uploaded as is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.upload_frame.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            frame_fname = self.get_frame_fname(fname)
+
+            if self.intermediate_format == "parquet":
+                self.upload_df_as_parquet(data_frame, frame_fname, bucket, log_file)
+
+            elif self.intermediate_format == "csv":
+                self.upload_df_as_csv(
+                    data_frame,
+                    frame_fname.split("/")[-1],
+                    frame_fname,
+                    bucket,
+                    log_file,
+                )
+
+            else:
+                raise ValueError(
+                    f"{self.intermediate_format} is not a supported intermediate format"
+                )
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return frame_fname
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def upload_frames_as_stream(self, frames, fname, bucket, log_file, commit=None):
+        """
+        Method Name :   upload_frames_as_stream
+        Description :   This method uploads the chunks of a file as a single file in the intermediate format
+                        in params.yaml. Every chunk is serialized and written to a multipart upload as soon as
+                        it arrives, so only one chunk and one part are held in memory. Later parquet chunks
+                        are cast to the schema of the first one. The parquet writer is closed whatever the
+                        outcome. When a chunk fails, or when commit is given and returns False once every chunk
+                        is written, the upload is aborted and nothing is written
+
+        Output      :   The chunks are uploaded to s3 bucket and the file name they were uploaded as is returned,
+                        or None if the upload was not committed
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.upload_frames_as_stream.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            if self.intermediate_format not in ("parquet", "csv"):
+                raise ValueError(
+                    f"{self.intermediate_format} is not a supported intermediate format"
+                )
+
+            frame_fname = self.get_frame_fname(fname)
+
+            stream = Multipart_Stream(self.storage, bucket, frame_fname, self.part_size)
+
+            writer, rows, header_written = None, 0, False
+
+            try:
+                try:
+                    for df in frames:
+                        if self.intermediate_format == "parquet":
+                            table = pa.Table.from_pandas(df, preserve_index=False)
+
+                            if writer is None:
+                                writer = pq.ParquetWriter(
+                                    stream,
+                                    table.schema,
+                                    compression=self.intermediate_compression,
+                                )
+
+                            else:
+                                table = table.cast(writer.schema)
+
+                            writer.write_table(table)
+
+                        else:
+                            stream.write(
+                                df.to_csv(
+                                    index=None, header=not header_written
+                                ).encode()
+                            )
+
+                            header_written = True
+
+                        rows += len(df)
+
+                finally:
+                    if writer is not None:
+                        writer.close()
+
+                if commit is not None and commit() is False:
+                    stream.abort()
+
+                    self.log_writer.log(
+                        log_file, f"Aborted upload of {frame_fname} to {bucket} bucket",
+                    )
+
+                    self.log_writer.start_log(
+                        "exit", self.class_name, method_name, log_file
+                    )
+
+                    return None
+
+                stream.close()
+
+            except Exception as e:
+                stream.abort()
+
+                raise e
+
+            self.log_writer.log(
+                log_file,
+                f"Uploaded {rows} rows as {frame_fname} to {bucket} bucket in {len(stream.parts)} parts",
+            )
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
+            return frame_fname
+
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
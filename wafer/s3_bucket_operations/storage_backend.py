@@ -0,0 +1,597 @@
+import fcntl
+import os
+import shutil
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from io import BytesIO
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from utils.read_params import read_params
+from wafer.s3_bucket_operations.s3_connection import get_s3_client
+
+conditional = threading.local()
+
+
+def add_conditional_headers(request, **kwargs):
+    """
+    Method Name :   add_conditional_headers
+    Description :   This method adds the conditional headers set by the current thread to a s3 PutObject
+                    request before it is signed. The pinned botocore has no IfMatch parameter on PutObject,
+                    so conditional writes are sent as plain If-Match and If-None-Match headers
+
+    Output      :   The conditional headers are added to the request
+    On Failure  :   Raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    for header, value in getattr(conditional, "headers", {}).items():
+        request.headers[header] = value
+
+
+class Storage_Object:
+    """
+    Description :   This class is a handle to a single object of a storage backend. Nothing is read
+                    until get is called, with the same kwargs as a s3 GET
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, storage, bucket_name, key):
+        self.storage = storage
+
+        self.bucket_name = bucket_name
+
+        self.key = key
+
+    def get(self, **get_kwargs):
+        return self.storage.get_object(self.bucket_name, self.key, **get_kwargs)
+
+
+class Multipart_Stream:
+    """
+    Description :   This class is a writable file object over a multipart upload of a storage backend.
+                    Written bytes are buffered and sent as a part whenever the buffer reaches the part size,
+                    so at most one part is held in memory. The object only appears once close is called,
+                    abort drops every uploaded part
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, storage, bucket_name, key, part_size):
+        self.storage = storage
+
+        self.bucket_name = bucket_name
+
+        self.key = key
+
+        self.part_size = part_size
+
+        self.upload_id = storage.create_multipart_upload(bucket_name, key)
+
+        self.buffer = BytesIO()
+
+        self.parts = []
+
+        self.position = 0
+
+        self.closed = False
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def write(self, data):
+        self.buffer.write(data)
+
+        self.position += len(data)
+
+        if self.buffer.tell() >= self.part_size:
+            self.upload_part()
+
+        return len(data)
+
+    def upload_part(self):
+        part_number = len(self.parts) + 1
+
+        etag = self.storage.upload_part(
+            self.bucket_name,
+            self.key,
+            self.upload_id,
+            part_number,
+            self.buffer.getvalue(),
+        )
+
+        self.parts.append({"ETag": etag, "PartNumber": part_number})
+
+        self.buffer = BytesIO()
+
+    def close(self):
+        if self.closed is True:
+            return
+
+        if self.buffer.tell() > 0 or not self.parts:
+            self.upload_part()
+
+        self.storage.complete_multipart_upload(
+            self.bucket_name, self.key, self.upload_id, self.parts
+        )
+
+        self.closed = True
+
+    def abort(self):
+        if self.closed is True:
+            return
+
+        self.storage.abort_multipart_upload(self.bucket_name, self.key, self.upload_id)
+
+        self.closed = True
+
+
+class Storage_Backend(ABC):
+    """
+    Description :   This class is the interface every storage backend implements. Buckets and keys follow
+                    the s3 layout, responses follow the shape of the s3 client responses and errors are
+                    raised as botocore ClientError, so callers do not depend on the backend in use. A backend
+                    which does not implement every method can not be created
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    @abstractmethod
+    def get_object(self, bucket, key, **get_kwargs):
+        raise NotImplementedError
+
+    @abstractmethod
+    def head_object(self, bucket, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_object(self, bucket, key, buffer):
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_object_if_match(self, bucket, key, buffer, etag=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def upload_file(self, bucket, key, fname):
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_objects(self, bucket, prefix, delimiter=None, page_size=1000):
+        raise NotImplementedError
+
+    @abstractmethod
+    def copy_object(self, from_bucket, from_key, to_bucket, to_key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_object(self, bucket, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_objects(self, bucket, keys):
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_multipart_upload(self, bucket, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def upload_part(self, bucket, key, upload_id, part_number, body):
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete_multipart_upload(self, bucket, key, upload_id, parts):
+        raise NotImplementedError
+
+    @abstractmethod
+    def abort_multipart_upload(self, bucket, key, upload_id):
+        raise NotImplementedError
+
+
+class S3_Storage_Backend(Storage_Backend):
+    """
+    Description :   This class is the storage backend for AWS S3, built on the shared s3 client
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, transfer_config):
+        self.s3_client = get_s3_client()
+
+        self.s3_client.meta.events.register(
+            "before-sign.s3.PutObject",
+            add_conditional_headers,
+            unique_id="add-conditional-headers",
+        )
+
+        self.transfer_config = transfer_config
+
+    def get_object(self, bucket, key, **get_kwargs):
+        return self.s3_client.get_object(Bucket=bucket, Key=key, **get_kwargs)
+
+    def head_object(self, bucket, key):
+        return self.s3_client.head_object(Bucket=bucket, Key=key)
+
+    def put_object(self, bucket, key, buffer):
+        self.s3_client.upload_fileobj(buffer, bucket, key, Config=self.transfer_config)
+
+    def put_object_if_match(self, bucket, key, buffer, etag=None):
+        conditional.headers = (
+            {"If-None-Match": "*"} if etag is None else {"If-Match": etag}
+        )
+
+        try:
+            return self.s3_client.put_object(Bucket=bucket, Key=key, Body=buffer)[
+                "ETag"
+            ]
+
+        finally:
+            conditional.headers = {}
+
+    def upload_file(self, bucket, key, fname):
+        self.s3_client.upload_file(fname, bucket, key, Config=self.transfer_config)
+
+    def list_objects(self, bucket, prefix, delimiter=None, page_size=1000):
+        list_kwargs = {
+            "Bucket": bucket,
+            "Prefix": prefix,
+            "PaginationConfig": {"PageSize": page_size},
+        }
+
+        if delimiter is not None:
+            list_kwargs["Delimiter"] = delimiter
+
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+
+        for page in paginator.paginate(**list_kwargs):
+            yield page
+
+    def copy_object(self, from_bucket, from_key, to_bucket, to_key):
+        copy_source = {"Bucket": from_bucket, "Key": from_key}
+
+        self.s3_client.copy(
+            copy_source, to_bucket, to_key, Config=self.transfer_config
+        )
+
+    def delete_object(self, bucket, key):
+        self.s3_client.delete_object(Bucket=bucket, Key=key)
+
+    def delete_objects(self, bucket, keys):
+        response = self.s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": k} for k in keys], "Quiet": True},
+        )
+
+        return response.get("Errors", [])
+
+    def create_multipart_upload(self, bucket, key):
+        response = self.s3_client.create_multipart_upload(Bucket=bucket, Key=key)
+
+        return response["UploadId"]
+
+    def upload_part(self, bucket, key, upload_id, part_number, body):
+        response = self.s3_client.upload_part(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+
+        return response["ETag"]
+
+    def complete_multipart_upload(self, bucket, key, upload_id, parts):
+        self.s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+
+    def abort_multipart_upload(self, bucket, key, upload_id):
+        self.s3_client.abort_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id
+        )
+
+
+class Local_Storage_Backend(Storage_Backend):
+    """
+    Description :   This class is the storage backend for a local directory. Every bucket is a folder
+                    under the root directory and every key is a file path inside it, so the pipeline can
+                    run without network access. The etag of a file is built from its modification time
+                    and size
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def get_path(self, bucket, key):
+        return os.path.join(self.root_dir, bucket, *key.split("/"))
+
+    def get_error(self, code, message, operation_name):
+        return ClientError(
+            {"Error": {"Code": code, "Message": message}}, operation_name
+        )
+
+    def get_etag(self, stat):
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def get_tmp_path(self, path):
+        return path + f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def head_object(self, bucket, key):
+        path = self.get_path(bucket, key)
+
+        if key.endswith("/") and os.path.isdir(path):
+            return {"ETag": '"0-0"', "ContentLength": 0}
+
+        if not os.path.isfile(path):
+            raise self.get_error("404", f"{key} not found in {bucket}", "HeadObject")
+
+        stat = os.stat(path)
+
+        return {
+            "ETag": self.get_etag(stat),
+            "ContentLength": stat.st_size,
+            "LastModified": datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+        }
+
+    def get_object(self, bucket, key, **get_kwargs):
+        head = self.head_object(bucket, key)
+
+        if "IfMatch" in get_kwargs and get_kwargs["IfMatch"] != head["ETag"]:
+            raise self.get_error("PreconditionFailed", f"{key} changed", "GetObject")
+
+        if get_kwargs.get("IfNoneMatch") == head["ETag"]:
+            raise self.get_error("304", "Not Modified", "GetObject")
+
+        body = open(self.get_path(bucket, key), "rb")
+
+        if "Range" in get_kwargs:
+            start, end = get_kwargs["Range"].split("=")[1].split("-")
+
+            body.seek(int(start))
+
+            content = body.read(int(end) - int(start) + 1)
+
+            body.close()
+
+            return {"Body": BytesIO(content), "ETag": head["ETag"]}
+
+        return {"Body": body, "ETag": head["ETag"]}
+
+    def put_object(self, bucket, key, buffer):
+        path = self.get_path(bucket, key)
+
+        if key.endswith("/"):
+            os.makedirs(path, exist_ok=True)
+
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = self.get_tmp_path(path)
+
+        with open(tmp_path, "wb") as f:
+            shutil.copyfileobj(buffer, f)
+
+        os.replace(tmp_path, path)
+
+    def put_object_if_match(self, bucket, key, buffer, etag=None):
+        os.makedirs(self.root_dir, exist_ok=True)
+
+        with open(os.path.join(self.root_dir, ".lock"), "w") as lock_f:
+            fcntl.flock(lock_f, fcntl.LOCK_EX)
+
+            try:
+                current_etag = self.head_object(bucket, key)["ETag"]
+
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "404":
+                    raise e
+
+                current_etag = None
+
+            if current_etag != etag:
+                raise self.get_error(
+                    "PreconditionFailed", f"{key} changed", "PutObject"
+                )
+
+            self.put_object(bucket, key, buffer)
+
+            return self.head_object(bucket, key)["ETag"]
+
+    def upload_file(self, bucket, key, fname):
+        with open(fname, "rb") as f:
+            self.put_object(bucket, key, f)
+
+    def list_objects(self, bucket, prefix, delimiter=None, page_size=1000):
+        bucket_dir = os.path.join(self.root_dir, bucket)
+
+        prefix_dir = (
+            self.get_path(bucket, prefix.rsplit("/", 1)[0])
+            if "/" in prefix
+            else bucket_dir
+        )
+
+        contents, common_prefixes = [], set()
+
+        for dir_path, _, file_names in os.walk(prefix_dir):
+            rel_dir = os.path.relpath(dir_path, bucket_dir).replace(os.sep, "/")
+
+            for file_name in file_names:
+                key = file_name if rel_dir == "." else rel_dir + "/" + file_name
+
+                if not key.startswith(prefix) or key.endswith(".tmp"):
+                    continue
+
+                sub_key = key[len(prefix) :]
+
+                if delimiter is not None and delimiter in sub_key:
+                    common_prefixes.add(
+                        prefix + sub_key.split(delimiter)[0] + delimiter
+                    )
+
+                    continue
+
+                stat = os.stat(os.path.join(dir_path, file_name))
+
+                contents.append(
+                    {
+                        "Key": key,
+                        "Size": stat.st_size,
+                        "ETag": self.get_etag(stat),
+                        "LastModified": datetime.fromtimestamp(
+                            stat.st_mtime, timezone.utc
+                        ),
+                    }
+                )
+
+        contents.sort(key=lambda c: c["Key"])
+
+        common_prefixes = [{"Prefix": p} for p in sorted(common_prefixes)]
+
+        for idx in range(0, max(len(contents), 1), page_size):
+            page = {"Contents": contents[idx : idx + page_size]}
+
+            if idx == 0:
+                page["CommonPrefixes"] = common_prefixes
+
+            yield page
+
+    def copy_object(self, from_bucket, from_key, to_bucket, to_key):
+        from_path = self.get_path(from_bucket, from_key)
+
+        if not os.path.isfile(from_path):
+            raise self.get_error("404", f"{from_key} not found", "CopyObject")
+
+        to_path = self.get_path(to_bucket, to_key)
+
+        os.makedirs(os.path.dirname(to_path), exist_ok=True)
+
+        tmp_path = self.get_tmp_path(to_path)
+
+        shutil.copyfile(from_path, tmp_path)
+
+        os.replace(tmp_path, to_path)
+
+    def delete_object(self, bucket, key):
+        path = self.get_path(bucket, key)
+
+        if os.path.isfile(path):
+            os.remove(path)
+
+    def delete_objects(self, bucket, keys):
+        errors = []
+
+        for key in keys:
+            try:
+                self.delete_object(bucket, key)
+
+            except Exception as e:
+                errors.append({"Key": key, "Message": str(e)})
+
+        return errors
+
+    def get_part_path(self, bucket, key, upload_id, part_number):
+        return self.get_path(bucket, key) + f".{upload_id}.{part_number}.tmp"
+
+    def create_multipart_upload(self, bucket, key):
+        os.makedirs(os.path.dirname(self.get_path(bucket, key)), exist_ok=True)
+
+        return uuid.uuid4().hex
+
+    def upload_part(self, bucket, key, upload_id, part_number, body):
+        with open(self.get_part_path(bucket, key, upload_id, part_number), "wb") as f:
+            f.write(body)
+
+        return f'"{upload_id}-{part_number}"'
+
+    def complete_multipart_upload(self, bucket, key, upload_id, parts):
+        path = self.get_path(bucket, key)
+
+        tmp_path = path + f".{upload_id}.tmp"
+
+        with open(tmp_path, "wb") as f:
+            for part in parts:
+                part_path = self.get_part_path(
+                    bucket, key, upload_id, part["PartNumber"]
+                )
+
+                with open(part_path, "rb") as part_f:
+                    shutil.copyfileobj(part_f, f)
+
+                os.remove(part_path)
+
+        os.replace(tmp_path, path)
+
+    def abort_multipart_upload(self, bucket, key, upload_id):
+        dir_path = os.path.dirname(self.get_path(bucket, key))
+
+        part_prefix = os.path.basename(self.get_path(bucket, key)) + f".{upload_id}."
+
+        for file_name in os.listdir(dir_path):
+            if file_name.startswith(part_prefix):
+                os.remove(os.path.join(dir_path, file_name))
+
+
+def get_storage_backend(config=None):
+    """
+    Method Name :   get_storage_backend
+    Description :   This method gets the storage backend selected in the storage section of params.yaml,
+                    from the given config when it was already read
+
+    Output      :   A s3 or local storage backend is returned
+    On Failure  :   Write an exception log and then raise an exception
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+    method_name = get_storage_backend.__name__
+
+    try:
+        if config is None:
+            config = read_params()
+
+        backend = config["storage"]["backend"]
+
+        if backend == "s3":
+            upload_chunk_size = (
+                config["s3_operation"]["upload_chunk_size_mb"] * 1024 ** 2
+            )
+
+            transfer_config = TransferConfig(
+                multipart_threshold=upload_chunk_size,
+                multipart_chunksize=upload_chunk_size,
+            )
+
+            return S3_Storage_Backend(transfer_config)
+
+        elif backend == "local":
+            return Local_Storage_Backend(config["storage"]["local_root_dir"])
+
+        else:
+            raise ValueError(f"{backend} is not a supported storage backend")
+
+    except Exception as e:
+        raise Exception(
+            f"Exception occured in {__file__}, Method : {method_name}, Error : {str(e)}"
+        )
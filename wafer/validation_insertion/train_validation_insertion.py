@@ -1,7 +1,9 @@
 from utils.logger import App_Logger
 from utils.read_params import read_params
+from utils.run_utils import get_run_id
 from wafer.data_transform.data_transformation_train import Data_Transform_Train
 from wafer.data_type_valid.data_type_valid_train import DB_Operation_Train
+from wafer.fused_stage.fused_stage_train import Fused_Stage_Train
 from wafer.raw_data_validation.train_data_validation import Raw_Train_Data_Validation
 
 
@@ -14,13 +16,21 @@ class Train_Validation:
     """
 
     def __init__(self, bucket):
-        self.raw_data = Raw_Train_Data_Validation(bucket)
+        self.config = read_params()
 
-        self.data_transform = Data_Transform_Train()
+        self.run_id = (
+            get_run_id() if self.config["run_folders"]["run_prefix"] is True else None
+        )
 
-        self.db_operation = DB_Operation_Train()
+        self.raw_data = Raw_Train_Data_Validation(bucket, self.run_id)
 
-        self.config = read_params()
+        self.data_transform = Data_Transform_Train(self.run_id)
+
+        self.db_operation = DB_Operation_Train(self.run_id)
+
+        self.fused_stage = Fused_Stage_Train(self.run_id)
+
+        self.use_fused_stage = self.config["validation"]["fused_stage"]
 
         self.class_name = self.__class__.__name__
 
@@ -64,38 +74,64 @@ class Train_Validation:
                 regex, LengthOfDateStampInFile, LengthOfTimeStampInFile
             )
 
-            self.raw_data.validate_col_length(NumberofColumns=noofcolumns)
+            if self.use_fused_stage is True:
+                good_lst = self.fused_stage.validate_and_transform(
+                    NumberofColumns=noofcolumns,
+                    column_names=column_names,
+                    manifest=self.raw_data.manifest,
+                )
 
-            self.raw_data.validate_missing_values_in_col()
+                self.log_writer.log(
+                    self.train_main_log,
+                    "Raw Data Validation and Data Transformation completed in a single pass !!",
+                )
 
-            self.log_writer.log(
-                self.train_main_log, "Raw Data Validation Completed !!",
-            )
+            else:
+                if self.raw_data.process_workers > 0:
+                    self.raw_data.validate_files_in_process_pool(
+                        NumberofColumns=noofcolumns
+                    )
 
-            self.log_writer.log(
-                self.train_main_log, "Starting Data Transformation",
-            )
+                else:
+                    self.raw_data.validate_col_length(NumberofColumns=noofcolumns)
 
-            self.data_transform.rename_target_column()
+                    self.raw_data.validate_missing_values_in_col()
 
-            self.data_transform.replace_missing_with_null()
+                self.log_writer.log(
+                    self.train_main_log, "Raw Data Validation Completed !!",
+                )
 
-            self.log_writer.log(
-                self.train_main_log, "Data Transformation completed !!",
-            )
+                self.log_writer.log(
+                    self.train_main_log, "Starting Data Transformation",
+                )
+
+                good_lst = self.data_transform.transform_good_data()
 
-            self.db_operation.insert_good_data_as_record(
-                db_name=self.good_data_db_name,
-                collection_name=self.good_data_collection_name,
+                self.log_writer.log(
+                    self.train_main_log, "Data Transformation completed !!",
+                )
+
+            inserted_files = self.db_operation.insert_good_data_as_record(
+                good_data_db_name=self.good_data_db_name,
+                good_data_collection_name=self.good_data_collection_name,
+                lst=good_lst,
+                manifest=self.raw_data.manifest,
             )
 
+            self.raw_data.manifest.record_inserted(inserted_files)
+
+            self.raw_data.manifest.save_manifest(self.train_main_log)
+
+            if self.run_id is not None:
+                self.raw_data.clean_runs_of_good_bad_data(self.train_main_log)
+
             self.log_writer.log(
                 self.train_main_log, "Data type validation Operation completed !!",
             )
 
-            self.db_operation.export_collection_to_csv(
-                db_name=self.good_data_db_name,
-                collection_name=self.good_data_collection_name,
+            self.db_operation.export_collection(
+                good_data_db_name=self.good_data_db_name,
+                good_data_collection_name=self.good_data_collection_name,
             )
 
             self.log_writer.start_log(